@@ -0,0 +1,65 @@
+"""
+Общие вспомогательные функции бенчмарков
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+from OpenSSL import crypto
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_key_pair(directory: str = None, bits: int = 2048) -> tuple:
+    """
+    Создает самоподписанный сертификат и приватный ключ в PEM-файлах
+
+    Returns:
+        Пути к файлам сертификата и ключа
+    """
+    directory = directory or tempfile.mkdtemp(prefix='esia-bench-')
+    pkey = crypto.PKey()
+    pkey.generate_key(crypto.TYPE_RSA, bits)
+    crt = crypto.X509()
+    crt.get_subject().CN = 'esia-client-benchmark'
+    crt.set_serial_number(1)
+    crt.gmtime_adj_notBefore(0)
+    crt.gmtime_adj_notAfter(24 * 60 * 60)
+    crt.set_issuer(crt.get_subject())
+    crt.set_pubkey(pkey)
+    crt.sign(pkey, 'sha256')
+    cert_file = os.path.join(directory, 'cert.pem')
+    key_file = os.path.join(directory, 'key.pem')
+    with open(cert_file, 'wb') as f:
+        f.write(crypto.dump_certificate(crypto.FILETYPE_PEM, crt))
+    with open(key_file, 'wb') as f:
+        f.write(crypto.dump_privatekey(crypto.FILETYPE_PEM, pkey))
+    return cert_file, key_file
+
+
+def current_rss() -> int:
+    """
+    Текущий размер резидентной памяти процесса в байтах
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def write_results(path: str, name: str, results: dict):
+    """
+    Сохраняет результаты в JSON-файл для сравнения между версиями
+    """
+    payload = {
+        'benchmark': name,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': sys.version.split()[0],
+        'results': results,
+    }
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2, ensure_ascii=False)
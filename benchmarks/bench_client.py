@@ -0,0 +1,197 @@
+"""
+Бенчмарк клиента против локальной заглушки ЕСИА/ЕБС
+
+Измеряет ops/sec, задержку p50/p99 и пиковую память Python (tracemalloc) для get_auth_url, sign,
+decode_payload, complete_authorization и получения профиля синхронным и асинхронным клиентами.
+
+    python benchmarks/bench_client.py --iterations 500 --latency 0.005 --output results.json
+    python benchmarks/bench_client.py --compare results.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+from _common import make_key_pair, write_results
+from stub_server import StubConfig, StubServer, make_jwt
+
+import esia_client
+from esia_client import AsyncAuth, AsyncSession, AsyncUserInfo, Auth, Scope, Settings, UserInfo
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def summarize(latencies: list, elapsed: float, peak_memory: int) -> dict:
+    return {
+        'ops': len(latencies),
+        'ops_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'mean_ms': statistics.mean(latencies) * 1000,
+        'peak_memory_bytes': peak_memory,
+    }
+
+
+def bench_sync(func, iterations: int, memory_iterations: int) -> dict:
+    func()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        op_started = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - op_started)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    for _ in range(memory_iterations):
+        func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return summarize(latencies, elapsed, peak)
+
+
+def bench_async(factory, iterations: int, memory_iterations: int, concurrency: int) -> dict:
+    async def run(count: int) -> list:
+        latencies = []
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with semaphore:
+                op_started = time.perf_counter()
+                await factory()
+                latencies.append(time.perf_counter() - op_started)
+
+        await asyncio.gather(*(one() for _ in range(count)))
+        return latencies
+
+    async def main():
+        await factory()
+        started = time.perf_counter()
+        latencies = await run(iterations)
+        elapsed = time.perf_counter() - started
+        tracemalloc.start()
+        await run(memory_iterations)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return summarize(latencies, elapsed, peak)
+
+    return asyncio.get_event_loop().run_until_complete(main())
+
+
+def run_benchmarks(args) -> dict:
+    cert_file, key_file = make_key_pair()
+    config = StubConfig(latency=args.latency, elements=args.elements, element_size=args.element_size)
+    results = {}
+
+    with StubServer(config) as server:
+        settings = Settings(esia_client_id='BENCH', redirect_uri='https://example.com/callback',
+                            cert_file=cert_file, private_key_file=key_file, esia_service_url=server.url,
+                            scopes=[Scope.Authorization, Scope.Fullname], pool_maxsize=max(args.concurrency, 10),
+                            connector_limit_per_host=args.concurrency)
+        auth = Auth(settings)
+        user_info = UserInfo(access_token='token', oid='1000000', settings=settings)
+        jwt_payload = make_jwt({'urn:esia:sbj': {'urn:esia:sbj:oid': 1000000}, 'exp': 0}).split('.')[1]
+        content = 'openid fullname2024.01.01 00:00:00 +0000BENCH00000000-0000-0000-0000-000000000000'
+
+        sync_benchmarks = {
+            'sign': lambda: settings.signer.sign(content),
+            'decode_payload': lambda: esia_client.utils.decode_payload(jwt_payload),
+            'get_auth_url': auth.get_auth_url,
+            'complete_authorization': lambda: auth.complete_authorization('code'),
+            'get_person_main_info': user_info.get_person_main_info,
+            'get_person_documents': user_info.get_person_documents,
+            'get_full_profile': user_info.get_full_profile,
+        }
+        for name, func in sync_benchmarks.items():
+            if args.only and name not in args.only:
+                continue
+            results[f'sync.{name}'] = bench_sync(func, args.iterations, args.memory_iterations)
+            print_result(f'sync.{name}', results[f'sync.{name}'])
+
+        async def async_benchmarks(session: AsyncSession) -> dict:
+            async_auth = AsyncAuth(settings, session=session)
+            async_user_info = AsyncUserInfo(access_token='token', oid='1000000', settings=settings, session=session)
+            return {
+                'get_auth_url_async': async_auth.get_auth_url_async,
+                'complete_authorization': lambda: async_auth.complete_authorization('code'),
+                'get_person_main_info': async_user_info.get_person_main_info,
+                'get_person_documents': async_user_info.get_person_documents,
+                'get_full_profile': async_user_info.get_full_profile,
+            }
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        session = AsyncSession(settings)
+        loop.run_until_complete(session.open())
+        try:
+            for name, factory in loop.run_until_complete(async_benchmarks(session)).items():
+                if args.only and name not in args.only:
+                    continue
+                results[f'async.{name}'] = bench_async(factory, args.iterations, args.memory_iterations,
+                                                       args.concurrency)
+                print_result(f'async.{name}', results[f'async.{name}'])
+        finally:
+            loop.run_until_complete(session.close())
+            loop.close()
+        settings.close()
+    return results
+
+
+def print_result(name: str, result: dict, baseline: dict = None):
+    line = (f'{name:<36} {result["ops_per_sec"]:>10.1f} ops/s  p50 {result["p50_ms"]:>8.2f} ms  '
+            f'p99 {result["p99_ms"]:>8.2f} ms  peak {result["peak_memory_bytes"] / 1024:>9.1f} KiB')
+    if baseline:
+        change = (result['ops_per_sec'] / baseline['ops_per_sec'] - 1) * 100 if baseline['ops_per_sec'] else 0
+        line += f'  ({change:+.1f}% ops/s)'
+    print(line, flush=True)
+
+
+def compare(current: dict, baseline_file: str, threshold: float) -> int:
+    with open(baseline_file) as f:
+        baseline = json.load(f)['results']
+    regressions = 0
+    print(f'\nComparison with {baseline_file}:')
+    for name, result in current.items():
+        if name not in baseline:
+            continue
+        print_result(name, result, baseline[name])
+        if result['ops_per_sec'] < baseline[name]['ops_per_sec'] * (1 - threshold):
+            regressions += 1
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--memory-iterations', type=int, default=20)
+    parser.add_argument('--concurrency', type=int, default=10, help='одновременные операции асинхронного клиента')
+    parser.add_argument('--latency', type=float, default=0.0, help='задержка ответов заглушки в секундах')
+    parser.add_argument('--elements', type=int, default=3, help='количество элементов в списочных ответах')
+    parser.add_argument('--element-size', type=int, default=200, help='размер элемента списочных ответов')
+    parser.add_argument('--only', nargs='*', help='имена бенчмарков без префикса sync./async.')
+    parser.add_argument('--output', help='файл для сохранения результатов в JSON')
+    parser.add_argument('--compare', help='файл с результатами предыдущего запуска')
+    parser.add_argument('--threshold', type=float, default=0.1, help='допустимое снижение ops/sec при сравнении')
+    args = parser.parse_args()
+
+    results = run_benchmarks(args)
+    if args.output:
+        write_results(args.output, 'client', results)
+        print(f'Results saved to {os.path.abspath(args.output)}')
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f'{regressions} benchmark(s) regressed by more than {args.threshold:.0%}')
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Бенчмарк времени импорта пакета для разных сценариев установки
+
+Каждый сценарий запускается в отдельном интерпретаторе. Кроме времени, сообщается, какие
+транспортные библиотеки были загружены.
+
+    python benchmarks/bench_import.py --repeat 20 --output import.json
+    python benchmarks/bench_import.py --path /path/to/other/checkout
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from _common import write_results
+
+SCENARIOS = {
+    'package': 'import esia_client',
+    'sync': 'from esia_client import Auth, UserInfo, Settings',
+    'async': 'from esia_client import AsyncAuth, AsyncUserInfo, Settings',
+}
+
+PROBE = '''
+import sys, time, json
+started = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - started
+print(json.dumps({{'elapsed': elapsed, 'modules': [m for m in ('aiohttp', 'requests') if m in sys.modules]}}))
+'''
+
+
+def measure(path: str, statement: str) -> dict:
+    env = {**os.environ, 'PYTHONPATH': path, 'PYTHONDONTWRITEBYTECODE': '0'}
+    output = subprocess.check_output([sys.executable, '-c', PROBE.format(statement=statement)], env=env, cwd=path)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--path', default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        help='каталог с пакетом esia_client')
+    parser.add_argument('--output', help='файл для сохранения результатов в JSON')
+    args = parser.parse_args()
+
+    results = {}
+    for name, statement in SCENARIOS.items():
+        measure(args.path, statement)
+        samples = [measure(args.path, statement) for _ in range(args.repeat)]
+        timings = [sample['elapsed'] * 1000 for sample in samples]
+        results[name] = {
+            'median_ms': statistics.median(timings),
+            'min_ms': min(timings),
+            'loaded': samples[-1]['modules'],
+        }
+        print(f'{name:<8} median {results[name]["median_ms"]:7.1f} ms  min {results[name]["min_ms"]:7.1f} ms  '
+              f'loaded: {", ".join(results[name]["loaded"]) or "-"}', flush=True)
+    if args.output:
+        write_results(args.output, 'import', results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""
+Бенчмарк памяти кэшированного профиля пользователя: словари против компактных моделей `esia_client.models`
+
+Для каждого представления создается `--profiles` профилей (общая информация, адреса, контакты, документы)
+и по tracemalloc считается занятая ими память в байтах на профиль.
+
+    python benchmarks/bench_models.py --profiles 20000 --output models.json
+"""
+import argparse
+import sys
+import tracemalloc
+
+from _common import write_results
+
+from esia_client import models
+from esia_client.codec import JsonCodec, default_codec
+
+
+def make_profile(i: int) -> dict:
+    return {
+        'main_info': {
+            'stateFacts': ['EntityRoot'], 'eTag': f'5C8E31A2{i:08X}', 'firstName': 'Иван', 'lastName': 'Иванов',
+            'middleName': 'Иванович', 'birthDate': '01.01.1980', 'birthPlace': 'г. Москва', 'gender': 'M',
+            'trusted': True, 'citizenship': 'RUS', 'snils': f'{i % 1000:03d}-456-789 01', 'inn': f'77{i:010d}',
+            'updatedOn': 1580000000 + i, 'status': 'REGISTERED', 'verifying': False, 'rIdDoc': 1000 + i,
+            'containsUpCfmCode': False,
+        },
+        'addresses': {
+            'stateFacts': ['hasSize'], 'size': 2,
+            'elements': [
+                {'stateFacts': ['Identifiable'], 'id': 100 + i, 'type': t, 'addressStr': 'г. Москва, ул. Тверская',
+                 'countryId': 'RUS', 'zipCode': '125009', 'street': 'Тверская', 'house': str(i % 100), 'flat': '1',
+                 'fiasCode': '77-0-000-000-000-000-0000-0000-000', 'region': 'Москва', 'eTag': f'A{i:08X}'}
+                for t in ('PRG', 'PLV')
+            ],
+        },
+        'contacts': {
+            'stateFacts': ['hasSize'], 'size': 2,
+            'elements': [
+                {'stateFacts': ['Identifiable'], 'id': 200 + i, 'type': 'EML', 'vrfStu': 'VERIFIED',
+                 'value': f'user{i}@example.com', 'eTag': f'B{i:08X}'},
+                {'stateFacts': ['Identifiable'], 'id': 300 + i, 'type': 'MBT', 'vrfStu': 'VERIFIED',
+                 'value': f'+7(900){i % 10000000:07d}', 'eTag': f'C{i:08X}'},
+            ],
+        },
+        'documents': {
+            'stateFacts': ['hasSize'], 'size': 1,
+            'elements': [
+                {'stateFacts': ['Identifiable'], 'id': 400 + i, 'type': 'RF_PASSPORT', 'vrfStu': 'VERIFIED',
+                 'series': '4500', 'number': f'{i % 1000000:06d}', 'issueDate': '01.01.2000', 'issueId': '770001',
+                 'issuedBy': 'ОВД района Тверской г. Москвы', 'eTag': f'D{i:08X}'},
+            ],
+        },
+    }
+
+
+MODELS = {'main_info': models.Person, 'addresses': models.Addresses, 'contacts': models.Contacts,
+          'documents': models.Documents}
+
+
+def as_dicts(bodies: dict, codec: JsonCodec) -> dict:
+    return {section: codec.loads(body) for section, body in bodies.items()}
+
+
+def as_models(bodies: dict, codec: JsonCodec) -> dict:
+    return {section: MODELS[section].from_bytes(body, codec) for section, body in bodies.items()}
+
+
+def as_accessed_models(bodies: dict, codec: JsonCodec) -> dict:
+    profile = as_models(bodies, codec)
+    profile['main_info'].last_name
+    for contact in profile['contacts']:
+        contact.value
+    return profile
+
+
+def as_bytes(bodies: dict, codec: JsonCodec) -> dict:
+    return dict(bodies)
+
+
+REPRESENTATIONS = {
+    'dict': as_dicts,
+    'model': as_models,
+    'model_accessed': as_accessed_models,
+    'bytes': as_bytes,
+}
+
+
+def received(bodies: dict) -> dict:
+    """
+    Копия тел ответов, как если бы они были только что получены от ЕСИА
+    """
+    return {section: bytes(bytearray(body)) for section, body in bodies.items()}
+
+
+def measure(build, bodies: list, codec: JsonCodec) -> float:
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        profiles = [build(received(item), codec) for item in bodies]
+        used = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    del profiles
+    return used / len(bodies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', type=int, default=10000, help='количество профилей в кэше')
+    parser.add_argument('--output', help='файл для сохранения результатов в JSON')
+    args = parser.parse_args()
+
+    codec = default_codec()
+    bodies = [{section: codec.dumps(data) for section, data in make_profile(i).items()}
+              for i in range(args.profiles)]
+
+    results = {}
+    for name, build in REPRESENTATIONS.items():
+        per_profile = measure(build, bodies, codec)
+        results[name] = {'bytes_per_profile': per_profile}
+        print(f'{name:<15} {per_profile:10.0f} bytes/profile', flush=True)
+    for name in results:
+        results[name]['vs_dict'] = results[name]['bytes_per_profile'] / results['dict']['bytes_per_profile']
+    print(f'codec: {codec.name}')
+    if args.output:
+        write_results(args.output, 'models', results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""
+Микробенчмарк построения URL: скомпилированные шаблоны `esia_client.endpoints` против `furl`
+
+Перед замером проверяется, что оба способа дают одинаковые URL.
+
+    python benchmarks/bench_urls.py --number 100000
+"""
+import argparse
+import sys
+import timeit
+
+from _common import write_results
+
+import furl
+
+from esia_client.endpoints import EsiaUrls
+
+SERVICE_URL = 'https://esia-portal1.test.gosuslugi.ru/'
+OID = '1000299654'
+AUTH_PARAMS = {
+    'client_id': 'TESTSYSTEM',
+    'redirect_uri': 'https://example.com/esia/callback',
+    'scope': 'openid fullname birthdate gender snils inn id_doc',
+    'response_type': 'code',
+    'state': '4f1c0b53-7f86-4a7a-93a5-2b4c0b2f6a51',
+    'timestamp': '2020.01.01 10:00:00 +0300',
+    'access_type': 'offline',
+    'client_secret': 'MIIHRwYJKoZIhvcNAQcCoIIHODCCBzQCAQExDzANBglghkgBZQMEAgEFADALBgkqhkiG9w0BBwGgggR' * 24,
+}
+
+
+def furl_cases(base: furl.furl) -> dict:
+    rest = base / 'rs'
+    return {
+        'person': lambda: str(rest / 'prns' / OID),
+        'addresses': lambda: str((rest / 'prns' / OID / 'addrs').add(args={'embed': '(elements)'})),
+        'document': lambda: str(rest / 'prns' / OID / 'docs' / str(42)),
+        'auth_url': lambda: str((base / '/aas/oauth2/ac').add(args=AUTH_PARAMS)),
+    }
+
+
+def template_cases(urls: EsiaUrls) -> dict:
+    return {
+        'person': lambda: urls.person.format(oid=OID),
+        'addresses': lambda: urls.addresses.format(oid=OID),
+        'document': lambda: urls.document.format(oid=OID, doc_id=42),
+        'auth_url': lambda: urls.authorization.with_query(AUTH_PARAMS),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=20000, help='количество вызовов в одном замере')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='файл для сохранения результатов в JSON')
+    args = parser.parse_args()
+
+    base = furl.furl(SERVICE_URL)
+    legacy, compiled = furl_cases(base), template_cases(EsiaUrls(base))
+
+    results = {}
+    for name in legacy:
+        if legacy[name]() != compiled[name]():
+            print(f'{name}: URL mismatch\n  furl:     {legacy[name]()}\n  template: {compiled[name]()}')
+            return 1
+        furl_us = min(timeit.repeat(legacy[name], number=args.number, repeat=args.repeat)) / args.number * 1e6
+        template_us = min(timeit.repeat(compiled[name], number=args.number, repeat=args.repeat)) / args.number * 1e6
+        results[name] = {'furl_us': furl_us, 'template_us': template_us, 'speedup': furl_us / template_us}
+        print(f'{name:<10} furl {furl_us:8.2f} us  template {template_us:8.2f} us  x{furl_us / template_us:.1f}',
+              flush=True)
+    if args.output:
+        write_results(args.output, 'urls', results)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
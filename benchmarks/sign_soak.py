@@ -0,0 +1,89 @@
+"""
+Нагрузочный тест подписи: проверяет, что память процесса не растет при большом количестве подписей,
+и измеряет количество подписей в секунду
+
+    python benchmarks/sign_soak.py --iterations 1000000
+    python benchmarks/sign_soak.py --iterations 100000 --legacy
+"""
+import argparse
+import base64
+import sys
+import time
+
+from _common import current_rss, make_key_pair, write_results
+
+from OpenSSL import crypto
+
+from esia_client.signing import Signer
+
+
+def legacy_sign(content: str, crt: crypto.X509, pkey: crypto.PKey) -> str:
+    """
+    Прежняя реализация `esia_client.utils.sign`, не освобождающая структуру PKCS7
+    """
+    bio_in = crypto._new_mem_buf(content.encode())
+    pkcs7 = crypto._lib.PKCS7_sign(crt._x509, pkey._pkey, crypto._ffi.NULL, bio_in, 0x40)
+    bio_out = crypto._new_mem_buf()
+    crypto._lib.i2d_PKCS7_bio(bio_out, pkcs7)
+    return base64.urlsafe_b64encode(crypto._bio_to_string(bio_out)).decode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=1000000)
+    parser.add_argument('--checkpoints', type=int, default=20, help='количество замеров памяти')
+    parser.add_argument('--warmup', type=int, default=1000)
+    parser.add_argument('--max-growth', type=float, default=5.0, help='допустимый рост RSS после прогрева, МБ')
+    parser.add_argument('--cert')
+    parser.add_argument('--key')
+    parser.add_argument('--legacy', action='store_true', help='измерить прежнюю реализацию')
+    parser.add_argument('--output', help='файл для сохранения результатов в JSON')
+    args = parser.parse_args()
+
+    cert_file, key_file = (args.cert, args.key) if args.cert and args.key else make_key_pair()
+    with open(cert_file, 'rb') as f:
+        crt = crypto.load_certificate(crypto.FILETYPE_PEM, f.read())
+    with open(key_file, 'rb') as f:
+        pkey = crypto.load_privatekey(crypto.FILETYPE_PEM, f.read())
+
+    if args.legacy:
+        def sign(content):
+            return legacy_sign(content, crt, pkey)
+    else:
+        sign = Signer(crt, pkey).sign
+
+    content = 'openid fullname2024.01.01 00:00:00 +0000client-id00000000-0000-0000-0000-000000000000'
+    for _ in range(args.warmup):
+        sign(content)
+
+    baseline = current_rss()
+    step = max(args.iterations // args.checkpoints, 1)
+    samples = []
+    started = time.perf_counter()
+    for i in range(1, args.iterations + 1):
+        sign(content)
+        if i % step == 0:
+            elapsed = time.perf_counter() - started
+            rss = current_rss()
+            samples.append({'signatures': i, 'rss': rss, 'elapsed': elapsed})
+            print(f'{i:>10} signatures  {i / elapsed:>9.1f} sig/s  rss {rss / 2 ** 20:8.1f} MiB '
+                  f'({(rss - baseline) / 2 ** 20:+.1f})', flush=True)
+    elapsed = time.perf_counter() - started
+
+    growth = (current_rss() - baseline) / 2 ** 20
+    results = {
+        'implementation': 'legacy' if args.legacy else 'signer',
+        'iterations': args.iterations,
+        'signatures_per_second': args.iterations / elapsed,
+        'rss_baseline': baseline,
+        'rss_growth_mib': growth,
+        'samples': samples,
+    }
+    print(f'{results["signatures_per_second"]:.1f} sig/s, RSS growth {growth:+.1f} MiB')
+    if args.output:
+        write_results(args.output, 'sign_soak', results)
+    return 0 if growth <= args.max_growth else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""
+Локальная заглушка ЕСИА и ЕБС для бенчмарков
+
+Обслуживает /aas/oauth2/te, /rs/prns/... и /api/v2/verifications с настраиваемой задержкой
+и размером ответа. Запуск отдельно: python benchmarks/stub_server.py --port 8080 --latency 0.02
+"""
+import argparse
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _b64(payload: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip('=')
+
+
+def make_jwt(payload: dict) -> str:
+    return '.'.join((_b64({'alg': 'none'}), _b64(payload), 'signature'))
+
+
+class StubConfig:
+    def __init__(self, latency: float = 0.0, elements: int = 3, element_size: int = 200):
+        """
+        Args:
+            latency: задержка каждого ответа в секундах
+            elements: количество элементов в ответах с embed=(elements)
+            element_size: размер текстового поля каждого элемента в символах
+
+        """
+        self.latency = latency
+        self.elements = elements
+        self.element_size = element_size
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    config = StubConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload: dict, status: int = 200, headers: dict = None):
+        body = json.dumps(payload).encode()
+        head = [f'HTTP/1.1 {status} OK', 'Content-Type: application/json', f'Content-Length: {len(body)}']
+        head += [f'{name}: {value}' for name, value in (headers or {}).items()]
+        # заголовки и тело отправляются одной записью, чтобы не ждать подтверждения TCP между ними
+        self.wfile.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+
+    def _elements(self, kind: str) -> dict:
+        return {
+            'stateFacts': ['hasSize'],
+            'size': self.config.elements,
+            'elements': [
+                {'id': i, 'type': kind, 'vrfStu': 'VERIFIED', 'value': 'x' * self.config.element_size}
+                for i in range(self.config.elements)
+            ],
+        }
+
+    def do_HEAD(self):
+        self.wfile.write(b'HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n')
+
+    def do_GET(self):
+        time.sleep(self.config.latency)
+        path = self.path.split('?')[0].rstrip('/')
+        parts = path.split('/')
+        if path.startswith('/api/v2/verifications') and path.endswith('/result'):
+            return self._send_json({'extended_result': make_jwt({'result': 'ok', 'session_id': parts[-2]})})
+        if path.startswith('/rs/prns/'):
+            oid = parts[3]
+            tail = parts[4:]
+            if not tail:
+                return self._send_json({'firstName': 'Иван', 'lastName': 'Иванов', 'trusted': True, 'oid': oid})
+            if tail[0] in ('addrs', 'ctts', 'docs') and len(tail) == 1:
+                return self._send_json(self._elements(tail[0]))
+            if tail[0] == 'docs':
+                return self._send_json({'id': tail[1], 'type': 'RF_PASSPORT', 'series': '0000', 'number': '000000'})
+        self._send_json({'error': 'not found'}, status=404)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        time.sleep(self.config.latency)
+        path = self.path.split('?')[0]
+        if path.startswith('/aas/oauth2/te'):
+            now = int(time.time())
+            token = make_jwt({'urn:esia:sbj': {'urn:esia:sbj:oid': 1000000}, 'exp': now + 3600, 'iat': now})
+            return self._send_json({
+                'access_token': token, 'id_token': token, 'refresh_token': 'refresh',
+                'expires_in': 3600, 'token_type': 'Bearer',
+            })
+        if path.startswith('/api/v2/verifications'):
+            return self._send_json({}, headers={'Location': 'https://ebs.example/?session_id=benchmark'})
+        self._send_json({'error': 'not found'}, status=404)
+
+
+class StubServer:
+    """
+    Заглушка в отдельном потоке текущего процесса
+    """
+
+    def __init__(self, config: StubConfig = None, host: str = '127.0.0.1', port: int = 0):
+        handler = type('Handler', (StubHandler,), {'config': config or StubConfig()})
+        self.server = ThreadingHTTPServer((host, port), handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--elements', type=int, default=3)
+    parser.add_argument('--element-size', type=int, default=200)
+    args = parser.parse_args()
+    with StubServer(StubConfig(args.latency, args.elements, args.element_size), args.host, args.port) as server:
+        print(f'Stub ESIA listening on {server.url}')
+        server.thread.join()
+
+
+if __name__ == '__main__':
+    main()
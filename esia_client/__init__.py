@@ -1,4 +1,83 @@
-from esia_client import exceptions, utils
-from esia_client.client import Settings, Scope, UserInfo, Auth, EBS
-from esia_client.async_client import AsyncAuth, AsyncUserInfo, AsyncEBS
+"""
+Клиент ЕСИА
 
+Публичные имена загружаются при первом обращении, поэтому синхронный клиент не импортирует
+aiohttp, а асинхронный - requests.
+"""
+import importlib
+
+__all__ = [
+    'exceptions', 'utils', 'bulk', 'models',
+    'Settings', 'Scope', 'UserInfo', 'Auth', 'EBS',
+    'AsyncAuth', 'AsyncUserInfo', 'AsyncEBS', 'AsyncSession', 'SigningPool',
+    'EndpointGroup',
+    'RateLimiter', 'TokenBucket',
+    'SingleFlight', 'AsyncSingleFlight',
+    'CacheBackend', 'MemoryCacheBackend', 'ResponseCache',
+    'TokenStore', 'AsyncTokenStore',
+    'AuthUrlPool',
+    'Metrics', 'MetricEvent',
+    'JsonCodec', 'OrjsonCodec',
+    'RetryPolicy', 'deadline',
+    'HedgePolicy',
+    'CircuitBreaker', 'CircuitState',
+    'VerificationPoller', 'VerificationResult',
+    'KeyRegistry',
+    'warmup', 'warmup_async', 'WarmupReport',
+]
+
+_SUBMODULES = {'exceptions', 'utils', 'bulk', 'models'}
+
+_ATTRIBUTES = {
+    'Settings': 'client',
+    'Scope': 'client',
+    'UserInfo': 'client',
+    'Auth': 'client',
+    'EBS': 'client',
+    'AsyncAuth': 'async_client',
+    'AsyncUserInfo': 'async_client',
+    'AsyncEBS': 'async_client',
+    'AsyncSession': 'transport',
+    'SigningPool': 'signing',
+    'EndpointGroup': 'endpoints',
+    'RateLimiter': 'ratelimit',
+    'TokenBucket': 'ratelimit',
+    'SingleFlight': 'singleflight',
+    'AsyncSingleFlight': 'singleflight',
+    'CacheBackend': 'cache',
+    'MemoryCacheBackend': 'cache',
+    'ResponseCache': 'cache',
+    'TokenStore': 'tokens',
+    'AsyncTokenStore': 'tokens',
+    'AuthUrlPool': 'urlpool',
+    'Metrics': 'metrics',
+    'MetricEvent': 'metrics',
+    'JsonCodec': 'codec',
+    'OrjsonCodec': 'codec',
+    'RetryPolicy': 'retry',
+    'deadline': 'retry',
+    'HedgePolicy': 'hedging',
+    'CircuitBreaker': 'circuit',
+    'CircuitState': 'circuit',
+    'VerificationPoller': 'polling',
+    'VerificationResult': 'polling',
+    'KeyRegistry': 'keys',
+    'warmup': 'warming',
+    'warmup_async': 'warming',
+    'WarmupReport': 'warming',
+}
+
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f'{__name__}.{name}')
+    module = _ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(f'{__name__}.{module}'), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
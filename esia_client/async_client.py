@@ -1,19 +1,47 @@
+import asyncio
 import logging
 import time
 import uuid
-from typing import List
+from typing import List, Union
 
 import furl
 
 import esia_client
+import esia_client.cache
+import esia_client.log
+import esia_client.models
 from esia_client import Scope
+from esia_client.signing import SigningPool
+from esia_client.transport import AsyncSession
 
 logger = logging.getLogger(__name__)
 
-__all__ = ['AsyncAuth', 'AsyncUserInfo', 'AsyncEBS']
+__all__ = ['AsyncAuth', 'AsyncUserInfo', 'AsyncEBS', 'AsyncSession', 'SigningPool']
+
+
+def _client_session(session: AsyncSession = None):
+    """
+    Сессия aiohttp для запроса, либо None для создания временной сессии
+    """
+    return session.client_session if session is not None else None
 
 
 class AsyncUserInfo(esia_client.UserInfo):
+    def __init__(self, access_token: str, oid: str, settings: esia_client.Settings,
+                 refresh_token: str = None, expires_at: float = None, session: AsyncSession = None):
+        """
+        Args:
+            access_token: токен авторизации
+            oid: идентификатор пользователя в системе ЕСИА
+            settings: настройки клиента ЕСИА
+            refresh_token: маркер обновления токена авторизации
+            expires_at: время истечения токена авторизации (unix time)
+            session: общая асинхронная HTTP-сессия
+        """
+        super().__init__(access_token=access_token, oid=oid, settings=settings,
+                         refresh_token=refresh_token, expires_at=expires_at)
+        self.session = session
+
     async def _request(self, url: str) -> dict:
         """
         Делает асинхронный запрос пользовательской информации в ЕСИА
@@ -26,53 +54,194 @@ class AsyncUserInfo(esia_client.UserInfo):
             HttpError: ошибка сети или сервера
 
         """
+        url = str(url)
+        cache = self.settings.response_cache
+        if cache is not None:
+            response = await cache.get_async(self.oid, self.token, url)
+            if response is not None:
+                return response
+
+        if self.settings.async_single_flight is not None:
+            response = await self.settings.async_single_flight.do((url, self.token), lambda: self._fetch(url))
+        else:
+            response = await self._fetch(url)
+
+        if cache is not None:
+            await cache.set_async(self.oid, self.token, url, response)
+        return response
+
+    async def _fetch(self, url: str) -> dict:
+        """
+        Запрос пользовательских данных с дублированием медленных попыток по `Settings.hedge_policy`
+        """
+        hedge_policy = self.settings.hedge_policy
+        if hedge_policy is None:
+            return await self._send_request(url)
+        return await hedge_policy.call_async(esia_client.cache.ResponseCache.section(url),
+                                             lambda: self._send_request(url))
+
+    async def _send_request(self, url: str) -> dict:
         headers = {'Authorization': "Bearer %s" % self.token, 'Accept': 'application/json'}
-        logger.info(f'Sending info request to; {url}')
+        esia_client.log.log_event(logger, logging.INFO, 'http.request', 'Sending info request to %s', url, url=url,
+                                  oid=self.oid)
 
-        return await esia_client.utils.make_async_request(url=str(url), headers=headers)
+        return await esia_client.utils.make_async_request(url=url, headers=headers,
+                                                          session=_client_session(self.session), settings=self.settings)
 
-    async def get_person_main_info(self) -> dict:
+    async def get_person_main_info(self, as_model: bool = False) -> Union[dict, esia_client.models.Person]:
         """
         Получение общей информации о пользователе
-        """
 
-        url = self._rest_base_url / 'prns' / self.oid
-        return await self._request(url=url)
+        Args:
+            as_model: вернуть компактную модель `esia_client.models.Person` вместо словаря
+        """
+        url = self.settings.endpoints.person.format(oid=self.oid)
+        response = await self._request(url=url)
+        return self._as_model(esia_client.models.Person, response) if as_model else response
 
-    async def get_person_addresses(self) -> dict:
+    async def get_person_addresses(self, as_model: bool = False) -> Union[dict, esia_client.models.Addresses]:
         """
         Получение адресов регистрации пользователя
-        """
 
-        url = self._rest_base_url / 'prns' / self.oid / 'addrs'
-        url.args['embed'] = '(elements)'
-        return await self._request(url=url)
+        Args:
+            as_model: вернуть компактную модель `esia_client.models.Addresses` вместо словаря
+        """
+        url = self.settings.endpoints.addresses.format(oid=self.oid)
+        response = await self._request(url=url)
+        return self._as_model(esia_client.models.Addresses, response) if as_model else response
 
-    async def get_person_contacts(self) -> dict:
+    async def get_person_contacts(self, as_model: bool = False) -> Union[dict, esia_client.models.Contacts]:
         """
         Получение пользовательский контактов
+
+        Args:
+            as_model: вернуть компактную модель `esia_client.models.Contacts` вместо словаря
         """
-        url = self._rest_base_url / 'prns' / self.oid / 'ctts'
-        url.args['embed'] = '(elements)'
-        return await self._request(url=url)
+        url = self.settings.endpoints.contacts.format(oid=self.oid)
+        response = await self._request(url=url)
+        return self._as_model(esia_client.models.Contacts, response) if as_model else response
 
-    async def get_person_documents(self) -> dict:
+    async def get_person_documents(self, as_model: bool = False) -> Union[dict, esia_client.models.Documents]:
         """
         Получение пользовательских документов
+
+        Args:
+            as_model: вернуть компактную модель `esia_client.models.Documents` вместо словаря
         """
-        url = self._rest_base_url / 'prns' / self.oid / 'docs'
-        url.args['embed'] = '(elements)'
-        return await self._request(url=url)
+        url = self.settings.endpoints.documents.format(oid=self.oid)
+        response = await self._request(url=url)
+        return self._as_model(esia_client.models.Documents, response) if as_model else response
 
-    async def get_person_passport(self, doc_id: int) -> dict:
+    async def get_person_passport(self, doc_id: int,
+                                  as_model: bool = False) -> Union[dict, esia_client.models.Document]:
         """
         Получение документа удостоверяющего личность пользователя
+
+        Args:
+            doc_id: идентификатор документа
+            as_model: вернуть компактную модель `esia_client.models.Document` вместо словаря
+        """
+        url = self.settings.endpoints.document.format(oid=self.oid, doc_id=doc_id)
+        response = await self._request(url=url)
+        return self._as_model(esia_client.models.Document, response) if as_model else response
+
+    async def invalidate_cache(self) -> int:
+        """
+        Удаляет сохраненные в кэше ответы пользователя
+
+        Returns:
+            Количество удаленных значений
         """
-        url = self._rest_base_url / 'prns' / self.oid / 'docs' / str(doc_id)
-        return await self._request(url=url)
+        if self.settings.response_cache is None:
+            return 0
+        return await self.settings.response_cache.invalidate_async(self.oid)
+
+    async def get_full_profile(self, max_concurrency: int = 4, as_model: bool = False) -> dict:
+        """
+        Конкурентное получение общей информации, адресов, контактов и документов пользователя
+
+        Ошибка получения одного из разделов не прерывает получение остальных: значение раздела
+        в результате будет None, а исключение попадет в словарь `errors` под именем раздела.
+
+        Args:
+            max_concurrency: максимальное количество одновременных запросов
+            as_model: вернуть разделы в виде компактных моделей `esia_client.models`
+
+        Returns:
+            Словарь с ключами main_info, addresses, contacts, documents и errors
+        """
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def fetch(method: str):
+            async with semaphore:
+                return await getattr(self, method)(as_model=as_model)
+
+        with esia_client.tracing.flow(self.settings.tracer):
+            results = await asyncio.gather(*(fetch(method) for _, method in self._PROFILE_SECTIONS),
+                                           return_exceptions=True)
+        profile = {section: None for section, _ in self._PROFILE_SECTIONS}
+        profile['errors'] = {}
+        for (section, _), result in zip(self._PROFILE_SECTIONS, results):
+            if isinstance(result, Exception):
+                logger.warning('Failed to get %s of user %s: %r', section, self.oid, result)
+                profile['errors'][section] = result
+            else:
+                profile[section] = result
+        return profile
 
 
 class AsyncAuth(esia_client.Auth):
+    def __init__(self, settings: esia_client.Settings, session: AsyncSession = None,
+                 signing_pool: SigningPool = None):
+        """
+        Args:
+            settings: настройки клиента ЕСИА
+            session: общая асинхронная HTTP-сессия, передается и в создаваемые `AsyncUserInfo`
+            signing_pool: пул формирования подписи, по умолчанию используется executor цикла событий
+        """
+        super().__init__(settings)
+        self.session = session
+        self.signing_pool = signing_pool
+
+    async def _sign_params_async(self, params: dict):
+        """
+        Подписывает параметры цифровой подписью в пуле, не блокируя цикл событий
+
+        Args:
+            params: параметры запроса
+
+        """
+        content = self._signature_content(params)
+        started = time.perf_counter()
+        with esia_client.tracing.span(self.settings.tracer, 'sign'):
+            if self.signing_pool is not None:
+                params['client_secret'] = await self.signing_pool.sign(content)
+            else:
+                loop = asyncio.get_running_loop()
+                params['client_secret'] = await loop.run_in_executor(None, self.settings.signer.sign, content)
+        if self.settings.metrics is not None:
+            self.settings.metrics.observe_signing(time.perf_counter() - started)
+        esia_client.log.log_event(logger, logging.DEBUG, 'sign', 'Signed request params, client secret size %d',
+                                  len(params['client_secret']))
+
+    async def get_auth_url_async(self,
+                                 state: Union[str, uuid.UUID] = None,
+                                 redirect_uri=None, scopes: List[Scope] = None,
+                                 **kwargs: dict) -> str:
+        """
+        Генерация URL перехода на сайт ЕСИА для авторизации пользователя с подписью вне цикла событий
+
+        Args:
+            state: идентификатор запроса
+            redirect_uri: ссылка для перенаправления пользователя после авторизации
+            scopes: разрешения на действия с данными учетной записи `esia_client.Scope`
+
+        Returns:
+            Ссылка авторизации
+        """
+        params = self._auth_url_params(state, redirect_uri, scopes, **kwargs)
+        await self._sign_params_async(params)
+        return self._build_auth_url(params)
 
     async def complete_authorization(self, code: str,
                                      state: str = None,
@@ -96,41 +265,67 @@ class AsyncAuth(esia_client.Auth):
 
         if not state:
             state = str(uuid.uuid4())
-        logger.info(f'Complete authorisation with state {state}')
-
-        params = {
-            'client_id': self.settings.esia_client_id,
-            'code': code,
-            'grant_type': 'authorization_code',
-            'redirect_uri': str(redirect_uri or self.settings.redirect_uri),
-            'timestamp': esia_client.utils.get_timestamp(),
-            'token_type': 'Bearer',
-            'scope': ' '.join([str(x) for x in scopes]) if scopes else self.settings.scope_string,
-            'state': state,
-        }
-
-        self._sign_params(params)
-
-        response_json = await esia_client.utils.make_async_request(
-            url=str(self.settings.esia_service_url / self._TOKEN_EXCHANGE_URL),
-            method='POST', data=params, timeout=self.settings.timeout
-        )
+        logger.info('Complete authorisation with state %s', state)
+
+        with esia_client.tracing.flow(self.settings.tracer):
+            params = self._token_params('authorization_code', state, redirect_uri, scopes, code=code)
+            await self._sign_params_async(params)
+            response_json = await self._exchange_token(params)
+            return AsyncUserInfo(settings=self.settings, session=self.session,
+                                 **self._parse_token_response(response_json))
+
+    async def refresh_authorization(self, refresh_token: str,
+                                    oid: str = None,
+                                    state: str = None,
+                                    redirect_uri: str = None,
+                                    scopes: List[Scope] = None) -> AsyncUserInfo:
+        """
+        Получение нового токена доступа по маркеру обновления
 
-        access_token = response_json['access_token']
-        id_token = response_json['id_token']
-        payload = esia_client.utils.decode_payload(id_token.split('.')[1])
-        logger.debug(f'Access token: {access_token}, id token: {id_token}')
+        Args:
+            refresh_token: маркер обновления, полученный при авторизации
+            oid: идентификатор пользователя, если ответ ЕСИА не содержит id_token
+            state: идентификатор запроса в формате `uuid.UUID`
+            redirect_uri: URL для переадресации после авторизации
+            scopes: разрешения на действия с данными учетной записи `esia_client.Scope`
+
+        Raises:
 
-        return AsyncUserInfo(access_token=access_token,
-                             oid=self._get_user_id(payload),
-                             settings=self.settings)
+            IncorrectJsonError: Неверный формат JSON-ответа
+            HttpError: Ошибка сети или сервера
+            IncorrectMarkerError: Неверный формат токена
+        """
+        if not state:
+            state = str(uuid.uuid4())
+        logger.info('Refresh authorisation with state %s', state)
+
+        with esia_client.tracing.flow(self.settings.tracer):
+            params = self._token_params('refresh_token', state, redirect_uri, scopes, refresh_token=refresh_token)
+            await self._sign_params_async(params)
+            response_json = await self._exchange_token(params)
+            return AsyncUserInfo(settings=self.settings, session=self.session,
+                                 **self._parse_token_response(response_json, oid=oid))
+
+    async def _exchange_token(self, params: dict) -> dict:
+        # повтор только с разрешения политики, см. `esia_client.Auth._exchange_token`
+        return await esia_client.utils.make_async_request(
+            url=self.settings.endpoints.token_exchange.format(),
+            method='POST', data=params, timeout=self.settings.timeout,
+            retry_safe=self._retry_token_exchange,
+            session=_client_session(self.session), settings=self.settings,
+        )
 
 
 class AsyncEBS(esia_client.EBS):
+    def __init__(self, oid: str, token: str, settings: esia_client.Settings, service_url: str = None,
+                 session_id: str = None, session: AsyncSession = None):
+        super().__init__(oid=oid, token=token, settings=settings, service_url=service_url, session_id=session_id)
+        self.session = session
+
     async def start_verification(self, redirect_uri: str = None) -> str:
         try:
             response = await esia_client.utils.make_async_request(
-                str(self.service_url / self._VERIFICATION_URL),
+                self._urls.verifications.format(),
                 method='POST',
                 headers=dict(Authorization=f'Bearer {self.token}'),
                 params=dict(redirect=str(redirect_uri or self.settings.redirect_uri)),
@@ -140,9 +335,10 @@ class AsyncEBS(esia_client.EBS):
                         user_id=str(self.oid),
                         info_system=self.settings.esia_client_id,
                         idp='ESIA',
-                    )))
+                    )),
+                session=_client_session(self.session), settings=self.settings)
         except esia_client.utils.FoundLocation as e:
-            logger.info(f'HTTP Found  at {e.location}')
+            logger.info('Verification session started, redirect to %s', e.location)
             self.session_id = furl.furl(e.location).args['session_id']
 
             return e.location
@@ -150,10 +346,14 @@ class AsyncEBS(esia_client.EBS):
         raise esia_client.exceptions.EsiaError(f'Unexpected response: {response}', )
 
     async def get_result(self):
-        response = await esia_client.utils.make_async_request(
-            str(self.service_url / self._VERIFICATION_URL / str(self.session_id) / 'result'),
-            headers=dict(Authorization=f'Bearer {self.token}')
-        )
-        payload = esia_client.utils.decode_payload(response['extended_result'].split('.')[1])
-        logger.debug(f'Verifcation result: {payload}')
+        response = await self._request_result()
+        payload = self._decode_result(response)
+        logger.debug('Verification result of session %s received', self.session_id)
         return payload
+
+    async def _request_result(self) -> dict:
+        return await esia_client.utils.make_async_request(
+            self._urls.result.format(session_id=self.session_id),
+            headers=dict(Authorization=f'Bearer {self.token}'),
+            session=_client_session(self.session), settings=self.settings,
+        )
@@ -0,0 +1,159 @@
+import asyncio
+import concurrent.futures
+import logging
+from typing import *
+
+from esia_client.async_client import AsyncUserInfo
+from esia_client.client import Settings, UserInfo
+from esia_client.transport import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['BulkResult', 'refresh_profiles', 'async_refresh_profiles']
+
+Credentials = Tuple[str, str]
+
+
+class BulkResult(NamedTuple):
+    """
+    Результат получения профиля одного пользователя при массовом обновлении
+    """
+    oid: str
+    profile: Optional[dict]
+    error: Optional[Exception]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def fetch_profile(user_info: UserInfo) -> dict:
+    """
+    Последовательное получение всех разделов профиля пользователя в текущем потоке
+
+    Ошибки разделов собираются в ключ `errors`, как в `UserInfo.get_full_profile`
+    """
+    profile = {section: None for section, _ in user_info._PROFILE_SECTIONS}
+    profile['errors'] = {}
+    for section, method in user_info._PROFILE_SECTIONS:
+        try:
+            profile[section] = getattr(user_info, method)()
+        except Exception as e:
+            logger.warning('Failed to get %s of user %s: %r', section, user_info.oid, e)
+            profile['errors'][section] = e
+    return profile
+
+
+async def async_fetch_profile(user_info: AsyncUserInfo) -> dict:
+    """
+    Конкурентное получение всех разделов профиля пользователя
+    """
+    return await user_info.get_full_profile()
+
+
+def refresh_profiles(credentials: Iterable[Credentials], settings: Settings, max_workers: int = 8,
+                     fetch: Callable[[UserInfo], Any] = fetch_profile) -> Iterator[BulkResult]:
+    """
+    Массовое получение профилей пользователей в пуле потоков
+
+    Пары (oid, access_token) читаются из `credentials` по мере освобождения потоков, поэтому
+    в памяти одновременно находится не более `max_workers` незавершенных заданий.
+    Результаты возвращаются в порядке завершения, ошибка одного пользователя не прерывает обработку.
+
+    Args:
+        credentials: пары (oid, access_token)
+        settings: настройки клиента ЕСИА
+        max_workers: количество одновременно обрабатываемых пользователей
+        fetch: функция получения данных по `UserInfo`, по умолчанию все разделы профиля
+
+    """
+    credentials = iter(credentials)
+
+    def run(oid: str, token: str) -> BulkResult:
+        try:
+            return BulkResult(oid, fetch(UserInfo(access_token=token, oid=oid, settings=settings)), None)
+        except Exception as e:
+            logger.warning('Failed to refresh profile of user %s: %r', oid, e)
+            return BulkResult(oid, None, e)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+
+        def submit_next() -> bool:
+            for oid, token in credentials:
+                pending.add(executor.submit(run, str(oid), token))
+                return True
+            return False
+
+        while len(pending) < max_workers and submit_next():
+            pass
+
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                pending.discard(future)
+                submit_next()
+                yield future.result()
+
+
+async def async_refresh_profiles(credentials: Union[Iterable[Credentials], AsyncIterable[Credentials]],
+                                 settings: Settings, session: AsyncSession = None, concurrency: int = 32,
+                                 fetch: Callable[[AsyncUserInfo], Awaitable[Any]] = async_fetch_profile
+                                 ) -> AsyncIterator[BulkResult]:
+    """
+    Массовое асинхронное получение профилей пользователей
+
+    Пары (oid, access_token) читаются из `credentials` (обычного или асинхронного итератора) по мере
+    завершения запросов, одновременно обрабатывается не более `concurrency` пользователей.
+    Результаты возвращаются в порядке завершения, ошибка одного пользователя не прерывает обработку.
+
+    Args:
+        credentials: пары (oid, access_token)
+        settings: настройки клиента ЕСИА
+        session: общая асинхронная HTTP-сессия
+        concurrency: количество одновременно обрабатываемых пользователей
+        fetch: корутина получения данных по `AsyncUserInfo`, по умолчанию все разделы профиля
+
+    """
+    if hasattr(credentials, '__aiter__'):
+        credentials = credentials.__aiter__()
+    else:
+        credentials = _aiter_sync(credentials)
+
+    async def run(oid: str, token: str) -> BulkResult:
+        try:
+            user_info = AsyncUserInfo(access_token=token, oid=oid, settings=settings, session=session)
+            return BulkResult(oid, await fetch(user_info), None)
+        except Exception as e:
+            logger.warning('Failed to refresh profile of user %s: %r', oid, e)
+            return BulkResult(oid, None, e)
+
+    pending = set()
+    exhausted = False
+
+    async def fill():
+        nonlocal exhausted
+        while not exhausted and len(pending) < concurrency:
+            try:
+                oid, token = await credentials.__anext__()
+            except StopAsyncIteration:
+                exhausted = True
+            else:
+                pending.add(asyncio.ensure_future(run(str(oid), token)))
+
+    try:
+        await fill()
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.difference_update(done)
+            await fill()
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _aiter_sync(iterable: Iterable[Credentials]) -> AsyncIterator[Credentials]:
+    for item in iterable:
+        yield item
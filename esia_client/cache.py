@@ -0,0 +1,249 @@
+import abc
+import asyncio
+import collections
+import hashlib
+import logging
+import threading
+import time
+import urllib.parse
+from typing import *
+
+import esia_client.codec
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['CacheBackend', 'MemoryCacheBackend', 'ResponseCache']
+
+
+class CacheBackend(abc.ABC):
+    """
+    Интерфейс хранилища кэша ответов
+
+    Значения хранятся в виде байтов, поэтому хранилище может быть внешним (Redis, memcached и т.п.)
+
+    Асинхронный клиент вызывает методы `get_async`, `set_async` и `delete_prefix_async`, которые
+    по умолчанию выполняют синхронные методы в пуле потоков цикла событий, чтобы запросы к внешнему
+    хранилищу не блокировали цикл. Хранилища с асинхронным клиентом переопределяют их.
+    """
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """
+        Возвращает значение по ключу или None, если значения нет или оно устарело
+        """
+
+    @abc.abstractmethod
+    def set(self, key: str, value: bytes, ttl: float):
+        """
+        Сохраняет значение на `ttl` секунд
+        """
+
+    @abc.abstractmethod
+    def delete_prefix(self, prefix: str) -> int:
+        """
+        Удаляет все значения, ключи которых начинаются с `prefix`, и возвращает их количество
+        """
+
+    async def get_async(self, key: str) -> Optional[bytes]:
+        return await asyncio.get_running_loop().run_in_executor(None, self.get, key)
+
+    async def set_async(self, key: str, value: bytes, ttl: float):
+        await asyncio.get_running_loop().run_in_executor(None, self.set, key, value, ttl)
+
+    async def delete_prefix_async(self, prefix: str) -> int:
+        return await asyncio.get_running_loop().run_in_executor(None, self.delete_prefix, prefix)
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Хранилище кэша в памяти процесса с вытеснением давно не использованных значений (LRU)
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            max_entries: максимальное количество значений
+            max_bytes: максимальный суммарный размер значений в байтах
+
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.evictions = 0
+        self._data = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float):
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            if len(value) > self.max_bytes:
+                # слишком большое значение не сохраняется, но и прежнее значение ключа больше не выдается
+                return
+            self._data[key] = (value, time.monotonic() + ttl)
+            self.size += len(value)
+            while len(self._data) > self.max_entries or self.size > self.max_bytes:
+                self._pop(next(iter(self._data)))
+                self.evictions += 1
+
+    def delete_prefix(self, prefix: str) -> int:
+        with self._lock:
+            keys = [key for key in self._data if key.startswith(prefix)]
+            for key in keys:
+                self._pop(key)
+            return len(keys)
+
+    # операции в памяти не блокируют цикл событий и выполняются без пула потоков
+
+    async def get_async(self, key: str) -> Optional[bytes]:
+        return self.get(key)
+
+    async def set_async(self, key: str, value: bytes, ttl: float):
+        self.set(key, value, ttl)
+
+    async def delete_prefix_async(self, prefix: str) -> int:
+        return self.delete_prefix(prefix)
+
+    def _pop(self, key: str):
+        value, _ = self._data.pop(key)
+        self.size -= len(value)
+
+
+class ResponseCache:
+    """
+    Кэш ответов запросов пользовательских данных
+
+    Ключи кэша содержат идентификатор пользователя и хэш токена доступа, поэтому данные одного
+    пользователя или токена не выдаются по запросу с другими учетными данными.
+    """
+
+    DEFAULT_TTLS = {
+        'main_info': 300,
+        'addresses': 3600,
+        'contacts': 3600,
+        'documents': 3600,
+        'document': 3600,
+    }
+
+    _SECTIONS = {
+        (): 'main_info',
+        ('addrs',): 'addresses',
+        ('ctts',): 'contacts',
+        ('docs',): 'documents',
+    }
+
+    def __init__(self, backend: CacheBackend = None, ttls: Mapping[str, float] = None,
+                 codec: esia_client.codec.JsonCodec = None):
+        """
+        Args:
+            backend: хранилище кэша, по умолчанию `MemoryCacheBackend`
+            ttls: время жизни значений в секундах по разделам (main_info, addresses, contacts, documents,
+                document), нулевое значение отключает кэширование раздела
+            codec: кодек JSON для сериализации значений, по умолчанию `esia_client.codec.default_codec()`
+
+        """
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttls = {**self.DEFAULT_TTLS, **(ttls or {})}
+        self.codec = codec if codec is not None else esia_client.codec.default_codec()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def section(cls, url: str) -> Optional[str]:
+        """
+        Раздел пользовательских данных по URL запроса
+        """
+        parts = urllib.parse.urlsplit(url).path.strip('/').split('/')
+        if 'prns' not in parts:
+            return None
+        parts = tuple(parts[parts.index('prns') + 2:])
+        if len(parts) == 2 and parts[0] == 'docs':
+            return 'document'
+        return cls._SECTIONS.get(parts)
+
+    @staticmethod
+    def _key(oid: str, token: str, url: str) -> str:
+        token_hash = hashlib.sha256(token.encode()).hexdigest()[:32]
+        return f'{oid}/{token_hash}/{url}'
+
+    def get(self, oid: str, token: str, url: str) -> Optional[dict]:
+        """
+        Возвращает сохраненный ответ или None
+        """
+        if not self.ttls.get(self.section(url)):
+            return None
+        return self._loaded(self.backend.get(self._key(oid, token, url)))
+
+    async def get_async(self, oid: str, token: str, url: str) -> Optional[dict]:
+        """
+        Возвращает сохраненный ответ или None, не блокируя цикл событий
+        """
+        if not self.ttls.get(self.section(url)):
+            return None
+        return self._loaded(await self.backend.get_async(self._key(oid, token, url)))
+
+    def _loaded(self, value: Optional[bytes]) -> Optional[dict]:
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return self.codec.loads(value) if value is not None else None
+
+    def set(self, oid: str, token: str, url: str, response: dict):
+        """
+        Сохраняет ответ, если для его раздела задано время жизни
+        """
+        ttl = self.ttls.get(self.section(url))
+        if ttl:
+            self.backend.set(self._key(oid, token, url), self.codec.dumps(response), ttl)
+
+    async def set_async(self, oid: str, token: str, url: str, response: dict):
+        """
+        Сохраняет ответ, если для его раздела задано время жизни, не блокируя цикл событий
+        """
+        ttl = self.ttls.get(self.section(url))
+        if ttl:
+            await self.backend.set_async(self._key(oid, token, url), self.codec.dumps(response), ttl)
+
+    def invalidate(self, oid: str) -> int:
+        """
+        Удаляет все сохраненные ответы пользователя
+
+        Returns:
+            Количество удаленных значений
+        """
+        removed = self.backend.delete_prefix(f'{oid}/')
+        logger.debug('Invalidated %d cached responses of user %s', removed, oid)
+        return removed
+
+    async def invalidate_async(self, oid: str) -> int:
+        """
+        Удаляет все сохраненные ответы пользователя, не блокируя цикл событий
+
+        Returns:
+            Количество удаленных значений
+        """
+        removed = await self.backend.delete_prefix_async(f'{oid}/')
+        logger.debug('Invalidated %d cached responses of user %s', removed, oid)
+        return removed
+
+    @property
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses}
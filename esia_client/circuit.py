@@ -0,0 +1,293 @@
+import collections
+import enum
+import logging
+import threading
+import time
+from typing import *
+
+import esia_client.exceptions
+import esia_client.log
+from esia_client.endpoints import EndpointGroup
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['CircuitState', 'Circuit', 'CircuitBreaker']
+
+
+class CircuitState(enum.Enum):
+    """
+    Состояние автоматического выключателя группы конечных точек
+    """
+    Closed = 'closed'
+    Open = 'open'
+    HalfOpen = 'half_open'
+
+    def __str__(self):
+        return self.value
+
+
+class Circuit:
+    """
+    Автоматический выключатель одной группы конечных точек
+
+    В закрытом состоянии запросы выполняются, результаты последних `window` запросов учитываются
+    в скользящем окне. Если доля ошибок или медленных запросов в окне превышает порог, выключатель
+    размыкается, и запросы отклоняются без обращения к сервису в течение `open_duration` секунд.
+    Затем выключатель переходит в полуоткрытое состояние и пропускает `half_open_calls` пробных запросов:
+    если все они успешны, выключатель замыкается, при первой ошибке снова размыкается. Разрешения пробных
+    запросов, результат которых не был учтен за `half_open_timeout` секунд, считаются потерянными
+    и выдаются снова, поэтому выключатель не может остаться в полуоткрытом состоянии навсегда.
+
+    Методы потокобезопасны и не блокируются, поэтому используются и синхронным, и асинхронным клиентом.
+    """
+
+    def __init__(self, group: EndpointGroup, failure_rate: float = 0.5, slow_call_rate: float = 0.8,
+                 slow_call_duration: float = 3.0, window: int = 50, min_calls: int = 10,
+                 open_duration: float = 30.0, half_open_calls: int = 3, half_open_timeout: float = None):
+        """
+        Args:
+            group: группа конечных точек
+            failure_rate: доля ошибок в окне, при которой выключатель размыкается
+            slow_call_rate: доля медленных запросов в окне, при которой выключатель размыкается
+            slow_call_duration: длительность запроса в секундах, начиная с которой запрос считается медленным
+            window: количество последних запросов, учитываемых в окне
+            min_calls: минимальное количество запросов в окне для оценки долей
+            open_duration: время в разомкнутом состоянии до пробных запросов в секундах
+            half_open_calls: количество пробных запросов в полуоткрытом состоянии
+            half_open_timeout: время ожидания результата пробных запросов в секундах, по умолчанию `open_duration`
+
+        """
+        self.group = group
+        self.failure_rate = failure_rate
+        self.slow_call_rate = slow_call_rate
+        self.slow_call_duration = slow_call_duration
+        self.min_calls = min_calls
+        self.open_duration = open_duration
+        self.half_open_calls = half_open_calls
+        self.half_open_timeout = half_open_timeout if half_open_timeout is not None else open_duration
+        self.state = CircuitState.Closed
+        self.rejected = 0
+        self.opened = 0
+        self._outcomes = collections.deque(maxlen=window)
+        self._failures = 0
+        self._slow_calls = 0
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        self._trial_successes = 0
+        self._trial_started_at = 0.0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def before_call(self) -> int:
+        """
+        Проверяет, можно ли выполнить запрос
+
+        Returns:
+            Разрешение запроса: номер состояния выключателя, в котором запрос был допущен
+
+        Raises:
+            CircuitOpenError: выключатель разомкнут или пробные запросы уже выполняются
+        """
+        with self._lock:
+            if self.state is CircuitState.Open:
+                if time.monotonic() - self._opened_at < self.open_duration:
+                    self.rejected += 1
+                    raise self._open_error()
+                self._transition(CircuitState.HalfOpen)
+            if self.state is CircuitState.HalfOpen:
+                now = time.monotonic()
+                if self._trial_calls >= self.half_open_calls:
+                    if now - self._trial_started_at < self.half_open_timeout:
+                        self.rejected += 1
+                        raise self._open_error()
+                    esia_client.log.log_event(logger, logging.WARNING, 'circuit.trial_timeout',
+                                              'Trial calls of %s endpoints did not finish in %.1fs, retrying',
+                                              self.group, self.half_open_timeout, group=str(self.group))
+                    self._trial_calls = self._trial_successes
+                self._trial_calls += 1
+                self._trial_started_at = now
+            return self._generation
+
+    def record(self, duration: float, failed: bool, permit: int = None):
+        """
+        Учитывает результат запроса
+
+        Результат запроса, допущенного в другом состоянии выключателя, не учитывается: иначе запрос,
+        начатый до размыкания, мог бы замкнуть выключатель вместо пробного запроса.
+
+        Args:
+            duration: длительность запроса в секундах
+            failed: запрос завершился ошибкой сервиса
+            permit: разрешение запроса из `before_call`
+        """
+        slow = duration >= self.slow_call_duration
+        with self._lock:
+            if permit is not None and permit != self._generation:
+                return
+            if self.state is CircuitState.HalfOpen:
+                if failed or slow:
+                    self._transition(CircuitState.Open)
+                else:
+                    self._trial_successes += 1
+                    if self._trial_successes >= self.half_open_calls:
+                        self._transition(CircuitState.Closed)
+                return
+            if self.state is CircuitState.Open:
+                return
+
+            if len(self._outcomes) == self._outcomes.maxlen:
+                old_failed, old_slow = self._outcomes[0]
+                self._failures -= old_failed
+                self._slow_calls -= old_slow
+            self._outcomes.append((failed, slow))
+            self._failures += failed
+            self._slow_calls += slow
+
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and (self._failures >= self.failure_rate * calls or
+                                            self._slow_calls >= self.slow_call_rate * calls):
+                self._transition(CircuitState.Open)
+
+    def release(self, permit: int = None):
+        """
+        Освобождает разрешение отмененного запроса без учета результата
+
+        Args:
+            permit: разрешение запроса из `before_call`
+        """
+        with self._lock:
+            if permit is not None and permit != self._generation:
+                return
+            if self.state is CircuitState.HalfOpen and self._trial_calls > 0:
+                self._trial_calls -= 1
+
+    def _transition(self, state: CircuitState):
+        previous, self.state = self.state, state
+        self._generation += 1
+        self._trial_calls = 0
+        self._trial_successes = 0
+        if state is CircuitState.Open:
+            self.opened += 1
+            self._opened_at = time.monotonic()
+        if state is not CircuitState.HalfOpen:
+            self._outcomes.clear()
+            self._failures = 0
+            self._slow_calls = 0
+        level = logging.WARNING if state is CircuitState.Open else logging.INFO
+        esia_client.log.log_event(logger, level, 'circuit.state', 'Circuit of %s endpoints changed from %s to %s',
+                                  self.group, previous, state, group=str(self.group), state=str(state))
+
+    def _open_error(self) -> esia_client.exceptions.CircuitOpenError:
+        retry_after = max(0.0, self.open_duration - (time.monotonic() - self._opened_at))
+        return esia_client.exceptions.CircuitOpenError(
+            f'Circuit of {self.group} endpoints is {self.state}, retry after {retry_after:.1f}s')
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'state': str(self.state),
+                'calls': len(self._outcomes),
+                'failures': self._failures,
+                'slow_calls': self._slow_calls,
+                'rejected': self.rejected,
+                'opened': self.opened,
+            }
+
+
+class CircuitBreaker:
+    """
+    Автоматические выключатели для групп конечных точек ЕСИА и ЕБС
+
+    Пока выключатель группы разомкнут, запросы группы завершаются ошибкой `CircuitOpenError`
+    без ожидания таймаута. Ошибками сервиса считаются ошибки соединения, таймауты, ответы 5xx
+    и некорректные ответы, ответы 4xx и отмененные запросы на состояние выключателя не влияют.
+
+    Пример:
+        CircuitBreaker(groups=[EndpointGroup.TokenExchange, EndpointGroup.Rest], open_duration=10)
+    """
+
+    def __init__(self, groups: Iterable[EndpointGroup] = (EndpointGroup.TokenExchange, EndpointGroup.Rest,
+                                                         EndpointGroup.EBS), **options):
+        """
+        Args:
+            groups: группы конечных точек с выключателями, запросы остальных групп не ограничиваются
+
+        Keyword Args:
+            Параметры `Circuit`: failure_rate, slow_call_rate, slow_call_duration, window, min_calls,
+            open_duration, half_open_calls, half_open_timeout
+        """
+        self.circuits = {EndpointGroup(group): Circuit(EndpointGroup(group), **options) for group in groups}
+
+    def before_call(self, group: EndpointGroup) -> Optional[int]:
+        """
+        Проверяет, можно ли выполнить запрос группы
+
+        Returns:
+            Разрешение запроса, передаваемое в `record` или `release`
+
+        Raises:
+            CircuitOpenError: выключатель группы разомкнут
+        """
+        circuit = self.circuits.get(group)
+        if circuit is not None:
+            return circuit.before_call()
+        return None
+
+    def release(self, group: EndpointGroup, permit: int = None):
+        """
+        Освобождает разрешение запроса группы, не дошедшего до отправки
+        """
+        circuit = self.circuits.get(group)
+        if circuit is not None:
+            circuit.release(permit)
+
+    def record(self, group: EndpointGroup, duration: float, error: BaseException = None, permit: int = None):
+        """
+        Учитывает результат запроса группы
+
+        Args:
+            group: группа конечных точек
+            duration: длительность запроса в секундах
+            error: ошибка запроса
+            permit: разрешение запроса из `before_call`
+        """
+        circuit = self.circuits.get(group)
+        if circuit is None:
+            return
+        if error is not None and not isinstance(error, Exception):
+            circuit.release(permit)
+        else:
+            circuit.record(duration, error is not None and self.is_failure(error), permit)
+
+    @staticmethod
+    def is_failure(error: BaseException) -> bool:
+        """
+        Является ли ошибка запроса признаком неработоспособности сервиса
+        """
+        if isinstance(error, esia_client.exceptions.HttpError):
+            return error.status is None or error.status >= 500
+        if isinstance(error, esia_client.exceptions.IncorrectJsonError):
+            return True
+        return not isinstance(error, esia_client.exceptions.EsiaError)
+
+    def state(self, group: EndpointGroup) -> CircuitState:
+        """
+        Состояние выключателя группы, группы без выключателя всегда замкнуты
+        """
+        circuit = self.circuits.get(group)
+        return circuit.state if circuit is not None else CircuitState.Closed
+
+    @property
+    def healthy(self) -> bool:
+        """
+        Все выключатели замкнуты
+        """
+        return all(circuit.state is CircuitState.Closed for circuit in self.circuits.values())
+
+    @property
+    def stats(self) -> Dict[str, dict]:
+        """
+        Состояние и статистика выключателей по группам конечных точек
+        """
+        return {str(group): circuit.stats for group, circuit in self.circuits.items()}
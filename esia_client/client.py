@@ -1,5 +1,8 @@
+import concurrent.futures
+import contextvars
 import enum
 import logging
+import threading
 import time
 import uuid
 from typing import *
@@ -7,7 +10,22 @@ from typing import *
 import furl
 from OpenSSL import crypto
 
+import esia_client.cache
+import esia_client.circuit
+import esia_client.codec
+import esia_client.endpoints
 import esia_client.exceptions
+import esia_client.hedging
+import esia_client.keys
+import esia_client.log
+import esia_client.metrics
+import esia_client.models
+import esia_client.ratelimit
+import esia_client.retry
+import esia_client.signing
+import esia_client.singleflight
+import esia_client.tracing
+import esia_client.transport
 import esia_client.utils
 
 __all__ = ['Settings', 'Scope', 'Auth', 'UserInfo']
@@ -38,7 +56,17 @@ class Scope(enum.Enum):
 
 class Settings:
     def __init__(self, esia_client_id: str, redirect_uri: str, cert_file: str, private_key_file: str,
-                 esia_service_url: str, scopes: Iterable[Scope], request_timeout: float = 5):
+                 esia_service_url: str, scopes: Iterable[Scope], request_timeout: float = 5,
+                 pool_connections: int = 10, pool_maxsize: int = 10, pool_block: bool = False,
+                 keep_alive: bool = True, connector_limit: int = 100, connector_limit_per_host: int = 0,
+                 dns_cache_ttl: int = 10, keepalive_timeout: float = 15,
+                 rate_limiter: esia_client.ratelimit.RateLimiter = None, coalesce_requests: bool = False,
+                 response_cache: esia_client.cache.ResponseCache = None, metrics: esia_client.metrics.Metrics = None,
+                 tracer: esia_client.tracing.Tracer = None, json_codec: esia_client.codec.JsonCodec = None,
+                 retry_policy: esia_client.retry.RetryPolicy = None,
+                 hedge_policy: esia_client.hedging.HedgePolicy = None,
+                 circuit_breaker: esia_client.circuit.CircuitBreaker = None,
+                 key_registry: esia_client.keys.KeyRegistry = None):
         """
         Настройки клиента ЕСИА
 
@@ -50,6 +78,25 @@ class Settings:
             esia_service_url: ссылка на стенд ЕСИА
             scopes: запрашиваемые разрешения на получение данных о пользователе
             request_timeout: таймаут HTTP запросов
+            pool_connections: количество хостов, для которых сохраняются пулы соединений
+            pool_maxsize: максимальное количество соединений к одному хосту
+            pool_block: ожидать освобождения соединения при исчерпании пула
+            keep_alive: переиспользовать HTTP-соединения между запросами
+            connector_limit: общее ограничение количества соединений асинхронной сессии
+            connector_limit_per_host: ограничение количества соединений асинхронной сессии к одному хосту
+            dns_cache_ttl: время жизни кэша DNS асинхронной сессии в секундах
+            keepalive_timeout: время простоя соединения асинхронной сессии до закрытия в секундах
+            rate_limiter: ограничитель частоты запросов по группам конечных точек
+            coalesce_requests: объединять одновременные одинаковые запросы пользовательских данных в один
+            response_cache: кэш ответов запросов пользовательских данных
+            metrics: сборщик метрик запросов и формирования подписи
+            tracer: трассировка фаз запросов и сценариев авторизации
+            json_codec: кодек JSON ответов и JWT токенов, по умолчанию orjson при наличии, иначе стандартный
+            retry_policy: политика повторных запросов при временных ошибках, по умолчанию без повторов
+            hedge_policy: дублирование медленных запросов пользовательских данных, по умолчанию отключено
+            circuit_breaker: автоматические выключатели групп конечных точек при недоступности сервиса
+            key_registry: реестр сертификатов и ключей, общий для настроек с одинаковыми файлами,
+                по умолчанию `esia_client.keys.default_registry()`
 
         """
         self.esia_client_id = str(esia_client_id)
@@ -57,37 +104,159 @@ class Settings:
         self.esia_service_url = furl.furl(esia_service_url)
         self.scopes = tuple(scopes)
         self.timeout = request_timeout
-        with open(cert_file, 'rb') as cert_file, \
-                open(private_key_file, 'rb') as pkey_file:
-            self._crt = crypto.load_certificate(crypto.FILETYPE_PEM, cert_file.read())
-            self._pkey = crypto.load_privatekey(crypto.FILETYPE_PEM, pkey_file.read())
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.pool_block = pool_block
+        self.keep_alive = keep_alive
+        self.connector_limit = connector_limit
+        self.connector_limit_per_host = connector_limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.rate_limiter = rate_limiter
+        self.single_flight = esia_client.singleflight.SingleFlight() if coalesce_requests else None
+        self.async_single_flight = esia_client.singleflight.AsyncSingleFlight() if coalesce_requests else None
+        self.response_cache = response_cache
+        self.metrics = metrics
+        self.tracer = tracer
+        self.json_codec = json_codec if json_codec is not None else esia_client.codec.default_codec()
+        self.retry_policy = retry_policy
+        self.hedge_policy = hedge_policy
+        self.circuit_breaker = circuit_breaker
+        self._endpoints = None
+        self._http_session = None
+        self._http_session_lock = threading.Lock()
+        self._profile_executor = None
+        registry = key_registry if key_registry is not None else esia_client.keys.default_registry()
+        self.keys = registry.get(cert_file, private_key_file)
+
+    @property
+    def signer(self) -> esia_client.signing.Signer:
+        """
+        Подпись запросов текущими сертификатом и ключом из `keys`
+        """
+        return self.keys.current.signer
+
+    @property
+    def _crt_pem(self) -> bytes:
+        return self.keys.current.crt_pem
+
+    @property
+    def _pkey_pem(self) -> bytes:
+        return self.keys.current.pkey_pem
+
+    @property
+    def _crt(self) -> crypto.X509:
+        return self.keys.current.crt
+
+    @property
+    def _pkey(self) -> crypto.PKey:
+        return self.keys.current.pkey
 
     @property
     def scope_string(self):
         return ' '.join((str(x) for x in self.scopes))
 
+    @property
+    def endpoints(self) -> esia_client.endpoints.EsiaUrls:
+        """
+        URL конечных точек ЕСИА, скомпилированные для текущего `esia_service_url`
+        """
+        endpoints = self._endpoints
+        if endpoints is None or endpoints.service_url is not self.esia_service_url:
+            endpoints = self._endpoints = esia_client.endpoints.EsiaUrls(self.esia_service_url)
+        return endpoints
+
+    @property
+    def http_session(self):
+        """
+        Общая для всех синхронных клиентов HTTP-сессия с пулом соединений, создается при первом обращении
+        """
+        if self._http_session is None:
+            with self._http_session_lock:
+                if self._http_session is None:
+                    self._http_session = esia_client.transport.create_session(
+                        pool_connections=self.pool_connections,
+                        pool_maxsize=self.pool_maxsize,
+                        pool_block=self.pool_block,
+                        keep_alive=self.keep_alive,
+                    )
+        return self._http_session
+
+    @property
+    def profile_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        """
+        Общий пул потоков `UserInfo.get_full_profile` по числу соединений к одному хосту, создается при первом
+        обращении
+        """
+        if self._profile_executor is None:
+            with self._http_session_lock:
+                if self._profile_executor is None:
+                    self._profile_executor = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.pool_maxsize, thread_name_prefix='esia-profile')
+        return self._profile_executor
+
+    def close(self):
+        """
+        Закрывает HTTP-сессию и все открытые соединения пула, останавливает пул потоков запросов профиля
+        """
+        with self._http_session_lock:
+            session, self._http_session = self._http_session, None
+            executor, self._profile_executor = self._profile_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+        if session is not None:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
 
 class UserInfo:
     """
     Клиент получения пользовательских данных из ЕСИА
     """
-
-    def __init__(self, access_token: str, oid: str, settings: Settings):
+    _PROFILE_SECTIONS = (
+        ('main_info', 'get_person_main_info'),
+        ('addresses', 'get_person_addresses'),
+        ('contacts', 'get_person_contacts'),
+        ('documents', 'get_person_documents'),
+    )
+
+    def __init__(self, access_token: str, oid: str, settings: Settings,
+                 refresh_token: str = None, expires_at: float = None):
         """
         Args:
             access_token: токен авторизации
             oid: идентификатор пользователя в системе ЕСИА
             settings: настройки клиента ЕСИА
+            refresh_token: маркер обновления токена авторизации
+            expires_at: время истечения токена авторизации (unix time)
         """
         self.token = access_token
         self.oid = str(oid)
         self.settings = settings
-        self._rest_base_url = settings.esia_service_url / 'rs'
+        self.refresh_token = refresh_token
+        self.expires_at = expires_at
+
+    @property
+    def _rest_base_url(self) -> furl.furl:
+        return self.settings.esia_service_url / 'rs'
 
     @property
     def as_dict(self):
         return {'oid': self.oid, 'token': self.token}
 
+    def expires_in(self, now: float = None) -> Optional[float]:
+        """
+        Время до истечения токена авторизации в секундах, None если время истечения неизвестно
+        """
+        if self.expires_at is None:
+            return None
+        return self.expires_at - (time.time() if now is None else now)
+
     def _request(self, url: str) -> dict:
         """
         Делает запрос пользовательской информации в ЕСИА
@@ -100,47 +269,156 @@ class UserInfo:
             HttpError: ошибка сети или сервера
 
         """
+        url = str(url)
+        cache = self.settings.response_cache
+        if cache is not None:
+            response = cache.get(self.oid, self.token, url)
+            if response is not None:
+                return response
+
+        if self.settings.single_flight is not None:
+            response = self.settings.single_flight.do((url, self.token), lambda: self._fetch(url))
+        else:
+            response = self._fetch(url)
+
+        if cache is not None:
+            cache.set(self.oid, self.token, url, response)
+        return response
+
+    def _fetch(self, url: str) -> dict:
+        """
+        Запрос пользовательских данных с дублированием медленных попыток по `Settings.hedge_policy`
+        """
+        hedge_policy = self.settings.hedge_policy
+        if hedge_policy is None:
+            return self._send_request(url)
+        return hedge_policy.call(esia_client.cache.ResponseCache.section(url), lambda: self._send_request(url))
+
+    def _send_request(self, url: str) -> dict:
         headers = {'Authorization': "Bearer %s" % self.token, 'Accept': 'application/json'}
-        logger.info(f'Sending info request to; {url}')
+        esia_client.log.log_event(logger, logging.INFO, 'http.request', 'Sending info request to %s', url, url=url,
+                                  oid=self.oid)
 
-        return esia_client.utils.make_request(url=str(url), headers=headers, timeout=self.settings.timeout)
+        return esia_client.utils.make_request(url=url, headers=headers, timeout=self.settings.timeout,
+                                              session=self.settings.http_session, settings=self.settings)
 
-    def get_person_main_info(self) -> dict:
+    def _as_model(self, model: Type[esia_client.models.Model], response: dict) -> esia_client.models.Model:
         """
-        Получение общей информации о пользователе
+        Компактная модель ответа, сериализованная кодеком настроек
         """
+        return model.from_dict(response, self.settings.json_codec)
 
-        url = self._rest_base_url / 'prns' / self.oid
-        return self._request(url=url)
+    def get_person_main_info(self, as_model: bool = False) -> Union[dict, esia_client.models.Person]:
+        """
+        Получение общей информации о пользователе
 
-    def get_person_addresses(self) -> dict:
+        Args:
+            as_model: вернуть компактную модель `esia_client.models.Person` вместо словаря
         """
-        Получение адресов регистрации пользователя
+        url = self.settings.endpoints.person.format(oid=self.oid)
+        response = self._request(url=url)
+        return self._as_model(esia_client.models.Person, response) if as_model else response
+
+    def get_person_addresses(self, as_model: bool = False) -> Union[dict, esia_client.models.Addresses]:
         """
+        Получение адресов регистрации пользователя
 
-        url = (self._rest_base_url / 'prns' / self.oid / 'addrs').add(args={'embed': '(elements)'})
-        return self._request(url=url)
+        Args:
+            as_model: вернуть компактную модель `esia_client.models.Addresses` вместо словаря
+        """
+        url = self.settings.endpoints.addresses.format(oid=self.oid)
+        response = self._request(url=url)
+        return self._as_model(esia_client.models.Addresses, response) if as_model else response
 
-    def get_person_contacts(self) -> dict:
+    def get_person_contacts(self, as_model: bool = False) -> Union[dict, esia_client.models.Contacts]:
         """
         Получение пользовательский контактов
+
+        Args:
+            as_model: вернуть компактную модель `esia_client.models.Contacts` вместо словаря
         """
-        url = (self._rest_base_url / 'prns' / self.oid / 'ctts').add(args={'embed': '(elements)'})
-        return self._request(url=url)
+        url = self.settings.endpoints.contacts.format(oid=self.oid)
+        response = self._request(url=url)
+        return self._as_model(esia_client.models.Contacts, response) if as_model else response
 
-    def get_person_documents(self) -> dict:
+    def get_person_documents(self, as_model: bool = False) -> Union[dict, esia_client.models.Documents]:
         """
         Получение пользовательских документов
+
+        Args:
+            as_model: вернуть компактную модель `esia_client.models.Documents` вместо словаря
         """
-        url = (self._rest_base_url / 'prns' / self.oid / 'docs').add(args={'embed': '(elements)'})
-        return self._request(url=url)
+        url = self.settings.endpoints.documents.format(oid=self.oid)
+        response = self._request(url=url)
+        return self._as_model(esia_client.models.Documents, response) if as_model else response
 
-    def get_person_passport(self, doc_id: int) -> dict:
+    def get_person_passport(self, doc_id: int, as_model: bool = False) -> Union[dict, esia_client.models.Document]:
         """
         Получение документа удостоверяющего личность пользователя
+
+        Args:
+            doc_id: идентификатор документа
+            as_model: вернуть компактную модель `esia_client.models.Document` вместо словаря
+        """
+        url = self.settings.endpoints.document.format(oid=self.oid, doc_id=doc_id)
+        response = self._request(url=url)
+        return self._as_model(esia_client.models.Document, response) if as_model else response
+
+    def invalidate_cache(self) -> int:
         """
-        url = self._rest_base_url / 'prns' / self.oid / 'docs' / str(doc_id)
-        return self._request(url=url)
+        Удаляет сохраненные в кэше ответы пользователя
+
+        Returns:
+            Количество удаленных значений
+        """
+        if self.settings.response_cache is None:
+            return 0
+        return self.settings.response_cache.invalidate(self.oid)
+
+    def get_full_profile(self, max_workers: int = 4, executor: concurrent.futures.Executor = None,
+                         as_model: bool = False) -> dict:
+        """
+        Параллельное получение общей информации, адресов, контактов и документов пользователя
+
+        Ошибка получения одного из разделов не прерывает получение остальных: значение раздела
+        в результате будет None, а исключение попадет в словарь `errors` под именем раздела.
+
+        Args:
+            max_workers: максимальное количество одновременных запросов
+            executor: пул потоков для выполнения запросов, по умолчанию `Settings.profile_executor`
+            as_model: вернуть разделы в виде компактных моделей `esia_client.models`
+
+        Returns:
+            Словарь с ключами main_info, addresses, contacts, documents и errors
+        """
+        if executor is None:
+            executor = self.settings.profile_executor
+        sections = iter(self._PROFILE_SECTIONS)
+        futures = {}
+
+        def submit_next() -> bool:
+            for section, method in sections:
+                future = executor.submit(contextvars.copy_context().run, getattr(self, method), as_model=as_model)
+                futures[future] = section
+                return True
+            return False
+
+        profile = {section: None for section, _ in self._PROFILE_SECTIONS}
+        profile['errors'] = {}
+        with esia_client.tracing.flow(self.settings.tracer):
+            while len(futures) < max(1, max_workers) and submit_next():
+                pass
+            while futures:
+                done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    section = futures.pop(future)
+                    submit_next()
+                    try:
+                        profile[section] = future.result()
+                    except Exception as e:
+                        logger.warning('Failed to get %s of user %s: %r', section, self.oid, e)
+                        profile['errors'][section] = e
+        return profile
 
 
 class Auth:
@@ -167,6 +445,19 @@ class Auth:
         Args:
             params: параметры запроса
 
+        """
+        started = time.perf_counter()
+        with esia_client.tracing.span(self.settings.tracer, 'sign'):
+            params['client_secret'] = self.settings.signer.sign(self._signature_content(params))
+        if self.settings.metrics is not None:
+            self.settings.metrics.observe_signing(time.perf_counter() - started)
+        esia_client.log.log_event(logger, logging.DEBUG, 'sign', 'Signed request params, client secret size %d',
+                                  len(params['client_secret']))
+
+    @staticmethod
+    def _signature_content(params: dict) -> str:
+        """
+        Строка параметров запроса, подписываемая цифровой подписью
         """
         parts = (
             str(params.get('scope', '')),
@@ -174,12 +465,10 @@ class Auth:
             params.get('client_id', ''),
             str(params.get('state', '')),
         )
-
-        params['client_secret'] = esia_client.utils.sign(''.join(parts), self.settings._crt, self.settings._pkey)
-        logger.info(f'Sign request params. Client secret size: {len(params["client_secret"])}')
+        return ''.join(parts)
 
     def get_auth_url(self,
-                     state: Union[str, uuid.UUID] = uuid.uuid4(),
+                     state: Union[str, uuid.UUID] = None,
                      redirect_uri=None, scopes: List[Scope] = None,
                      **kwargs: dict):
         """
@@ -193,7 +482,16 @@ class Auth:
         Returns:
             Ссылка авторизации
         """
-        params = {
+        params = self._auth_url_params(state, redirect_uri, scopes, **kwargs)
+        self._sign_params(params)
+        return self._build_auth_url(params)
+
+    def _auth_url_params(self, state: Union[str, uuid.UUID] = None, redirect_uri=None,
+                         scopes: List[Scope] = None, **kwargs) -> dict:
+        """
+        Формирует неподписанные параметры URL авторизации
+        """
+        return {
             'client_id': self.settings.esia_client_id,
             'redirect_uri': str(redirect_uri or self.settings.redirect_uri),
             'scope': ' '.join([str(x) for x in scopes]) if scopes else self.settings.scope_string,
@@ -203,8 +501,9 @@ class Auth:
             'access_type': 'offline',
             **kwargs,
         }
-        self._sign_params(params)
-        return str((self.settings.esia_service_url / self._AUTHORIZATION_URL).add(args=params))
+
+    def _build_auth_url(self, params: dict) -> str:
+        return self.settings.endpoints.authorization.with_query(params)
 
     def complete_authorization(self, code,
                                state: str = None,
@@ -228,12 +527,54 @@ class Auth:
 
         if not state:
             state = str(uuid.uuid4())
-        logger.info(f'Complete authorisation with state {state}')
+        logger.info('Complete authorisation with state %s', state)
+
+        with esia_client.tracing.flow(self.settings.tracer):
+            params = self._token_params('authorization_code', state, redirect_uri, scopes, code=code)
+            self._sign_params(params)
+            response_json = self._exchange_token(params)
+            return UserInfo(settings=self.settings, **self._parse_token_response(response_json))
+
+    def refresh_authorization(self, refresh_token: str,
+                              oid: str = None,
+                              state: str = None,
+                              redirect_uri: str = None,
+                              scopes: List[Scope] = None) -> UserInfo:
+        """
+        Получение нового токена доступа по маркеру обновления
+
+        Args:
+            refresh_token: маркер обновления, полученный при авторизации
+            oid: идентификатор пользователя, если ответ ЕСИА не содержит id_token
+            state: идентификатор запроса в формате `uuid.UUID`
+            redirect_uri: URL для переадресации после авторизации
+            scopes: разрешения на действия с данными учетной записи `esia_client.Scope`
+
+        Raises:
+
+            IncorrectJsonError: Неверный формат JSON-ответа
+            HttpError: Ошибка сети или сервера
+            IncorrectMarkerError: Неверный формат токена
+        """
+        if not state:
+            state = str(uuid.uuid4())
+        logger.info('Refresh authorisation with state %s', state)
 
-        params = {
+        with esia_client.tracing.flow(self.settings.tracer):
+            params = self._token_params('refresh_token', state, redirect_uri, scopes, refresh_token=refresh_token)
+            self._sign_params(params)
+            response_json = self._exchange_token(params)
+            return UserInfo(settings=self.settings, **self._parse_token_response(response_json, oid=oid))
+
+    def _token_params(self, grant_type: str, state: str, redirect_uri: str = None,
+                      scopes: List[Scope] = None, **kwargs) -> dict:
+        """
+        Формирует неподписанные параметры запроса получения токена
+        """
+        return {
             'client_id': self.settings.esia_client_id,
-            'code': code,
-            'grant_type': 'authorization_code',
+            **kwargs,
+            'grant_type': grant_type,
             'redirect_uri': str(redirect_uri or self.settings.redirect_uri),
             'timestamp': esia_client.utils.get_timestamp(),
             'token_type': 'Bearer',
@@ -241,21 +582,49 @@ class Auth:
             'state': state,
         }
 
-        self._sign_params(params)
-
-        response_json = esia_client.utils.make_request(
-            url=str(self.settings.esia_service_url / self._TOKEN_EXCHANGE_URL),
+    @property
+    def _retry_token_exchange(self) -> bool:
+        policy = self.settings.retry_policy
+        return policy is not None and policy.retry_token_exchange
+
+    def _exchange_token(self, params: dict) -> dict:
+        # код авторизации и маркер обновления одноразовые: повтор запроса, который ЕСИА уже обработала,
+        # завершится ошибкой invalid_grant, поэтому без явного разрешения в политике повторяются только
+        # запросы, не дошедшие до сервиса из-за ошибки соединения
+        return esia_client.utils.make_request(
+            url=self.settings.endpoints.token_exchange.format(),
             method='POST', data=params, timeout=self.settings.timeout,
+            retry_safe=self._retry_token_exchange,
+            session=self.settings.http_session, settings=self.settings,
         )
 
-        access_token = response_json['access_token']
-        id_token = response_json['id_token']
-        payload = esia_client.utils.decode_payload(id_token.split('.')[1])
-        logger.debug(f'Access token: {access_token}, id token: {id_token}')
-
-        return UserInfo(access_token=access_token,
-                        oid=self._get_user_id(payload),
-                        settings=self.settings)
+    def _parse_token_response(self, response_json: dict, oid: str = None) -> dict:
+        """
+        Разбор ответа на запрос получения токена в аргументы клиента получения пользовательских данных
+        """
+        try:
+            access_token = response_json['access_token']
+        except KeyError:
+            raise esia_client.exceptions.IncorrectMarkerError(response_json)
+        id_token = response_json.get('id_token')
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug('Access token %s, id token %s', esia_client.log.token_fingerprint(access_token),
+                         esia_client.log.token_fingerprint(id_token))
+        with esia_client.tracing.span(self.settings.tracer, 'jwt.decode'):
+            if id_token:
+                payload = esia_client.utils.decode_payload(id_token.split('.')[1], self.settings.json_codec)
+                oid = self._get_user_id(payload)
+            elif not oid:
+                raise esia_client.exceptions.IncorrectMarkerError(response_json)
+            expires_at = esia_client.utils.get_token_expiration(access_token, response_json.get('expires_in'),
+                                                            self.settings.json_codec)
+
+        return {
+            'access_token': access_token,
+            'oid': oid,
+            'refresh_token': response_json.get('refresh_token'),
+            'expires_at': expires_at,
+        }
 
     @staticmethod
     def _get_user_id(payload: dict) -> str:
@@ -264,7 +633,7 @@ class Auth:
         """
         try:
             user_id = payload['urn:esia:sbj']['urn:esia:sbj:oid']
-            logger.debug(f'Found user id: {user_id}')
+            logger.debug('Found user id: %s', user_id)
             return user_id
         except KeyError:
             raise esia_client.exceptions.IncorrectMarkerError(payload)
@@ -280,6 +649,7 @@ class EBS:
         self.settings = settings
         self.service_url = furl.furl(service_url or self._SERIVCE_URL)
         self.session_id = session_id
+        self._urls = esia_client.endpoints.ebs_urls(str(self.service_url))
 
     @property
     def as_dict(self):
@@ -288,7 +658,7 @@ class EBS:
     def start_verification(self, redirect_uri: str = None) -> str:
         try:
             response = esia_client.utils.make_request(
-                str(self.service_url / self._VERIFICATION_URL),
+                self._urls.verifications.format(),
                 method='POST',
                 headers=dict(Authorization=f'Bearer {self.token}'),
                 params=dict(redirect=str(redirect_uri or self.settings.redirect_uri)),
@@ -298,9 +668,10 @@ class EBS:
                         user_id=str(self.oid),
                         info_system=self.settings.esia_client_id,
                         idp='ESIA',
-                    )))
+                    )),
+                session=self.settings.http_session, settings=self.settings)
         except esia_client.utils.FoundLocation as e:
-            logger.info(f'HTTP Found  at {e.location}')
+            logger.info('Verification session started, redirect to %s', e.location)
             self.session_id = furl.furl(e.location).args['session_id']
 
             return e.location
@@ -309,9 +680,20 @@ class EBS:
 
     def get_result(self):
         response = esia_client.utils.make_request(
-            self.service_url / self._VERIFICATION_URL / str(self.session_id) / 'result',
-            headers=dict(Authorization=f'Bearer {self.token}')
+            self._urls.result.format(session_id=self.session_id),
+            headers=dict(Authorization=f'Bearer {self.token}'),
+            session=self.settings.http_session, settings=self.settings,
         )
 
-        payload = esia_client.utils.decode_payload(response['extended_result'].split('.')[1])
+        payload = self._decode_result(response)
         return payload
+
+    def _decode_result(self, response: dict) -> dict:
+        """
+        Расшифровка результата верификации из ответа ЕБС
+
+        Raises:
+            KeyError: результат верификации еще не готов
+            IncorrectMarkerError: некорректный формат результата
+        """
+        return esia_client.utils.decode_payload(response['extended_result'].split('.')[1], self.settings.json_codec)
@@ -0,0 +1,68 @@
+import json
+import logging
+from typing import *
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['JsonCodec', 'OrjsonCodec', 'default_codec']
+
+
+class JsonCodec:
+    """
+    Кодек JSON на стандартной библиотеке
+
+    Ответы ЕСИА и ЕБС, полезная нагрузка JWT и значения кэша декодируются через кодек из `Settings`.
+    Для подключения другой библиотеки достаточно переопределить `loads` и `dumps`.
+    """
+    name = 'json'
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        """
+        Декодирует JSON из байтов ответа (UTF-8, UTF-16 или UTF-32) или строки
+
+        Raises:
+            ValueError: некорректный JSON
+        """
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        """
+        Кодирует объект в JSON в кодировке UTF-8
+        """
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode()
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.name}>'
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    Кодек JSON на библиотеке orjson, декодирует байты ответа без промежуточной строки
+
+    Raises:
+        ImportError: библиотека orjson не установлена
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+
+        self.loads = orjson.loads
+        self.dumps = orjson.dumps
+
+
+_default_codec = None
+
+
+def default_codec() -> JsonCodec:
+    """
+    Кодек по умолчанию: orjson, если библиотека установлена, иначе стандартная библиотека
+    """
+    global _default_codec
+    if _default_codec is None:
+        try:
+            _default_codec = OrjsonCodec()
+        except ImportError:
+            _default_codec = JsonCodec()
+        logger.debug('Default JSON codec: %s', _default_codec.name)
+    return _default_codec
@@ -0,0 +1,191 @@
+import enum
+import functools
+import re
+import urllib.parse
+from typing import *
+
+import furl
+
+__all__ = ['EndpointGroup', 'resolve_group', 'UrlTemplate', 'EsiaUrls', 'EbsUrls', 'ebs_urls', 'encode_query']
+
+
+class EndpointGroup(enum.Enum):
+    """
+    Группы конечных точек ЕСИА и ЕБС с общими ограничениями и статистикой
+    """
+    TokenExchange = 'token_exchange'
+    Rest = 'rest'
+    EBS = 'ebs'
+    Other = 'other'
+
+    def __str__(self):
+        return self.value
+
+
+_GROUP_PATH_PREFIXES = (
+    ('/aas/oauth2/te', EndpointGroup.TokenExchange),
+    ('/rs/', EndpointGroup.Rest),
+    ('/api/v2/verifications', EndpointGroup.EBS),
+)
+
+
+def resolve_group(url: str) -> EndpointGroup:
+    """
+    Определяет группу конечной точки по URL запроса
+
+    Args:
+        url: URL запроса
+
+    """
+    path = urllib.parse.urlsplit(str(url)).path
+    for prefix, group in _GROUP_PATH_PREFIXES:
+        if path.startswith(prefix):
+            return group
+    return EndpointGroup.Other
+
+
+_UNRESERVED_SEGMENT = re.compile(r'[A-Za-z0-9._~-]+')
+
+
+def encode_query(params: Mapping[str, Any]) -> str:
+    """
+    Кодирует параметры запроса так же, как `furl.furl.add(args=...)`
+
+    Пробелы кодируются как `+`, все символы, кроме `A-Za-z0-9_.-~`, экранируются.
+    Для значения None в строку добавляется только ключ.
+
+    Args:
+        params: параметры запроса
+
+    """
+    quote = urllib.parse.quote_plus
+    return '&'.join(
+        quote(str(key), safe='') if value is None else f'{quote(str(key), safe="")}={quote(str(value), safe="")}'
+        for key, value in params.items()
+    )
+
+
+class UrlTemplate:
+    """
+    URL конечной точки, скомпилированный один раз для базового URL сервиса
+
+    Сегменты пути вида `{name}` подставляются при вызове `format`. Результат совпадает с построением URL
+    через `furl`: значения из незарезервированных символов подставляются как есть, остальные значения
+    передаются в `furl`.
+
+    Пример:
+        template = UrlTemplate('https://esia.gosuslugi.ru/', 'rs', 'prns', '{oid}', 'docs')
+        template.format(oid='1000')
+    """
+    __slots__ = ('_base', '_segments', '_args', '_parts', '_fields')
+
+    def __init__(self, base: Union[str, furl.furl], *segments: str, args: Mapping[str, str] = None):
+        """
+        Args:
+            base: базовый URL сервиса
+            segments: сегменты пути, `{name}` - подставляемое значение
+            args: постоянные параметры запроса
+
+        """
+        self._base = furl.furl(base)
+        self._segments = segments
+        self._args = dict(args or {})
+        self._fields = tuple(segment[1:-1] for segment in segments if self._is_field(segment))
+
+        markers = {field: f'esiafield{index}x' for index, field in enumerate(self._fields)}
+        compiled = self._build(markers)
+        self._parts = []
+        for field in self._fields:
+            head, compiled = compiled.split(markers[field], 1)
+            self._parts.append(head)
+        self._parts.append(compiled)
+
+    @staticmethod
+    def _is_field(segment: str) -> bool:
+        return segment.startswith('{') and segment.endswith('}')
+
+    def _build(self, values: Mapping[str, str]) -> str:
+        url = self._base.copy()
+        for segment in self._segments:
+            url /= str(values[segment[1:-1]]) if self._is_field(segment) else segment
+        if self._args:
+            url.add(args=self._args)
+        return str(url)
+
+    def format(self, **values: Any) -> str:
+        """
+        Формирует URL с подстановкой значений сегментов
+
+        Raises:
+            KeyError: не передано значение сегмента
+        """
+        result = [self._parts[0]]
+        for field, part in zip(self._fields, self._parts[1:]):
+            value = str(values[field])
+            if not _UNRESERVED_SEGMENT.fullmatch(value):
+                return self._build(values)
+            result.append(value)
+            result.append(part)
+        return ''.join(result)
+
+    def with_query(self, params: Mapping[str, Any], **values: Any) -> str:
+        """
+        Формирует URL с подстановкой значений сегментов и дополнительными параметрами запроса
+        """
+        url = self.format(**values)
+        if not params:
+            return url
+        return f'{url}{"&" if "?" in url else "?"}{encode_query(params)}'
+
+    def __str__(self):
+        return self._parts[0] + ''.join(f'{{{field}}}{part}' for field, part in zip(self._fields, self._parts[1:]))
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self}>'
+
+
+class EsiaUrls:
+    """
+    Скомпилированные URL конечных точек ЕСИА для одного базового URL сервиса
+    """
+
+    def __init__(self, service_url: Union[str, furl.furl]):
+        """
+        Args:
+            service_url: ссылка на стенд ЕСИА
+        """
+        self.service_url = service_url
+        self.authorization = UrlTemplate(service_url, '/aas/oauth2/ac')
+        self.token_exchange = UrlTemplate(service_url, '/aas/oauth2/te')
+        self.person = UrlTemplate(service_url, 'rs', 'prns', '{oid}')
+        self.addresses = UrlTemplate(service_url, 'rs', 'prns', '{oid}', 'addrs', args={'embed': '(elements)'})
+        self.contacts = UrlTemplate(service_url, 'rs', 'prns', '{oid}', 'ctts', args={'embed': '(elements)'})
+        self.documents = UrlTemplate(service_url, 'rs', 'prns', '{oid}', 'docs', args={'embed': '(elements)'})
+        self.document = UrlTemplate(service_url, 'rs', 'prns', '{oid}', 'docs', '{doc_id}')
+
+
+class EbsUrls:
+    """
+    Скомпилированные URL конечных точек ЕБС для одного базового URL сервиса
+    """
+
+    def __init__(self, service_url: Union[str, furl.furl]):
+        """
+        Args:
+            service_url: ссылка на сервис ЕБС
+        """
+        self.service_url = service_url
+        self.verifications = UrlTemplate(service_url, '/api/v2/verifications')
+        self.result = UrlTemplate(service_url, '/api/v2/verifications', '{session_id}', 'result')
+
+
+@functools.lru_cache(maxsize=32)
+def ebs_urls(service_url: str) -> EbsUrls:
+    """
+    Скомпилированные URL ЕБС, общие для всех клиентов с одинаковым адресом сервиса
+
+    Args:
+        service_url: ссылка на сервис ЕБС
+
+    """
+    return EbsUrls(service_url)
@@ -1,4 +1,6 @@
-import requests.exceptions
+import importlib.util
+import threading
+from typing import Optional
 
 
 class EsiaError(Exception):
@@ -13,14 +15,62 @@ class IncorrectMarkerError(EsiaError):
     pass
 
 
-class HttpError(EsiaError, requests.exceptions.HTTPError):
+class InaccessableInformationRequestError(EsiaError):
     pass
 
 
-class InaccessableInformationRequestError(EsiaError):
+class SignatureError(EsiaError):
     pass
 
 
-class SignatureError(EsiaError):
+class TokenExpiredError(EsiaError):
+    pass
+
+
+class DeadlineExceededError(EsiaError, TimeoutError):
+    pass
+
+
+class CircuitOpenError(EsiaError):
     pass
 
+
+_http_error_lock = threading.Lock()
+
+
+def _create_http_error() -> type:
+    """
+    Создает класс HttpError, наследуемый от requests.HTTPError при установленной зависимости sync
+
+    Класс создается при первом обращении, чтобы асинхронный клиент не импортировал requests.
+    """
+    if importlib.util.find_spec('requests') is not None:
+        from requests.exceptions import HTTPError as base
+    else:
+        base = OSError
+
+    class HttpError(EsiaError, base):
+        @property
+        def status(self) -> Optional[int]:
+            """
+            HTTP статус ответа, если ошибка вызвана ответом сервера
+            """
+            cause = self.args[0] if self.args else None
+            response = getattr(cause, 'response', None)
+            if response is not None:
+                return response.status_code
+            return getattr(cause, 'status', None)
+
+    HttpError.__module__ = __name__
+    HttpError.__qualname__ = 'HttpError'
+    return HttpError
+
+
+def __getattr__(name: str):
+    if name == 'HttpError':
+        global HttpError
+        with _http_error_lock:
+            if 'HttpError' not in globals():
+                HttpError = _create_http_error()
+        return HttpError
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
@@ -0,0 +1,270 @@
+import asyncio
+import collections
+import concurrent.futures
+import contextvars
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from typing import *
+
+import esia_client.log
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['HedgePolicy']
+
+
+class _Hedge:
+    __slots__ = ('func', 'context', 'finished', 'future')
+
+    def __init__(self, func: Callable[[], Any], context: contextvars.Context):
+        self.func = func
+        self.context = context
+        self.finished = False
+        self.future = None
+
+
+class HedgePolicy:
+    """
+    Дублирование медленных идемпотентных запросов пользовательских данных
+
+    Если первая попытка не получила ответ за время, равное заданному процентилю задержки ответов
+    раздела, отправляется вторая попытка. В асинхронном клиенте используется первый полученный ответ,
+    проигравшая попытка отменяется.
+
+    Доля дублирующих запросов ограничена бюджетом: каждый запрос пополняет бюджет на `max_hedge_rate`,
+    каждый дублирующий запрос расходует единицу, поэтому при деградации ЕСИА нагрузка возрастает
+    не более чем в `1 + max_hedge_rate` раз.
+
+    В синхронном клиенте первая попытка выполняется в вызывающем потоке и не может быть прервана, поэтому
+    вторая попытка сокращает ожидание только при ошибке первой (например, таймауте зависшего соединения):
+    к этому моменту вторая попытка уже выполняется или завершена. Вторые попытки запускаются общим
+    потоком планировщика в пуле не более чем из `burst` потоков.
+    """
+
+    def __init__(self, percentile: float = 95, initial_delay: float = 0.5, min_delay: float = 0.01,
+                 max_delay: float = 2.0, max_hedge_rate: float = 0.05, burst: float = 10, window: int = 512,
+                 min_samples: int = 20):
+        """
+        Args:
+            percentile: процентиль задержки ответов раздела, после которой отправляется вторая попытка
+            initial_delay: задержка до накопления `min_samples` замеров раздела в секундах
+            min_delay: минимальная задержка второй попытки в секундах
+            max_delay: максимальная задержка второй попытки в секундах
+            max_hedge_rate: максимальная доля дублирующих запросов от всех запросов
+            burst: максимальный запас бюджета дублирующих запросов
+            window: количество последних замеров задержки раздела для расчета процентиля
+            min_samples: количество замеров, после которого задержка рассчитывается по процентилю
+
+        Raises:
+            ValueError: некорректный процентиль или доля дублирующих запросов
+        """
+        if not 0 < percentile < 100:
+            raise ValueError(f'Percentile must be between 0 and 100, got {percentile}')
+        if not 0 <= max_hedge_rate <= 1:
+            raise ValueError(f'Hedge rate must be between 0 and 1, got {max_hedge_rate}')
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_hedge_rate = max_hedge_rate
+        self.burst = burst
+        self.window = window
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedges_sent = 0
+        self.hedges_won = 0
+        self.budget_exhausted = 0
+        self._budget = burst
+        self._samples = collections.defaultdict(lambda: collections.deque(maxlen=window))
+        self._delays = {}
+        self._lock = threading.Lock()
+        self._schedule = []
+        self._counter = itertools.count()
+        self._schedule_condition = threading.Condition()
+        self._scheduler = None
+        self._executor = None
+
+    def delay(self, key: Hashable) -> float:
+        """
+        Задержка второй попытки для раздела в секундах
+        """
+        return self._delays.get(key, self.initial_delay)
+
+    def observe(self, key: Hashable, latency: float):
+        """
+        Добавляет замер задержки ответа раздела
+        """
+        with self._lock:
+            samples = self._samples[key]
+            samples.append(latency)
+            if len(samples) >= self.min_samples and len(samples) % 8 == 0:
+                ordered = sorted(samples)
+                value = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100))]
+                self._delays[key] = min(self.max_delay, max(self.min_delay, value))
+
+    def _start_request(self):
+        with self._lock:
+            self.requests += 1
+            self._budget = min(self.burst, self._budget + self.max_hedge_rate)
+
+    def _acquire_hedge(self) -> bool:
+        with self._lock:
+            if self._budget < 1:
+                self.budget_exhausted += 1
+                return False
+            self._budget -= 1
+            self.hedges_sent += 1
+            return True
+
+    def _hedge_won(self, key: Hashable):
+        with self._lock:
+            self.hedges_won += 1
+        esia_client.log.log_event(logger, logging.DEBUG, 'hedge.won', 'Hedged request to %s section won', key,
+                                  section=key)
+
+    def _observer(self, key: Hashable) -> Callable[[Any], None]:
+        """
+        Обработчик завершения первой попытки, добавляющий замер задержки раздела
+
+        Задержка отмененной попытки учитывается до момента отмены, иначе медленные ответы, проигравшие
+        второй попытке, выпадали бы из выборки и занижали процентиль.
+        """
+        started = time.perf_counter()
+
+        def observe(future):
+            if future.cancelled() or future.exception() is None:
+                self.observe(key, time.perf_counter() - started)
+
+        return observe
+
+    def _schedule_hedge(self, key: Hashable, func: Callable[[], Any]) -> '_Hedge':
+        """
+        Планирует вторую попытку синхронного запроса через задержку раздела
+        """
+        hedge = _Hedge(func, contextvars.copy_context())
+        with self._schedule_condition:
+            if self._scheduler is None:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=max(1, math.ceil(self.burst)), thread_name_prefix='esia-hedge')
+                self._scheduler = threading.Thread(target=self._run_scheduler, name='esia-hedge-scheduler',
+                                                   daemon=True)
+                self._scheduler.start()
+            heapq.heappush(self._schedule, (time.monotonic() + self.delay(key), next(self._counter), hedge))
+            self._schedule_condition.notify()
+        return hedge
+
+    def _run_scheduler(self):
+        """
+        Запускает вторые попытки синхронных запросов, первые попытки которых не завершились за задержку раздела
+        """
+        with self._schedule_condition:
+            while True:
+                if not self._schedule:
+                    self._schedule_condition.wait()
+                    continue
+                due, _, hedge = self._schedule[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._schedule_condition.wait(delay)
+                    continue
+                heapq.heappop(self._schedule)
+                if not hedge.finished and self._acquire_hedge():
+                    hedge.future = self._executor.submit(hedge.context.run, hedge.func)
+
+    def _finish_primary(self, hedge: '_Hedge') -> Optional[concurrent.futures.Future]:
+        """
+        Отмечает завершение первой попытки и возвращает вторую попытку, если она была запущена
+        """
+        with self._schedule_condition:
+            hedge.finished = True
+            return hedge.future
+
+    def call(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Выполняет `func` с отправкой второй попытки, если первая не завершилась за задержку раздела
+
+        Первая попытка выполняется в вызывающем потоке, вторая в пуле не более чем из `burst` потоков.
+        Если первая попытка завершилась ошибкой, используется результат второй.
+
+        Args:
+            key: раздел пользовательских данных, по которому считается задержка
+            func: функция без аргументов, выполняющая запрос
+
+        """
+        self._start_request()
+        hedge = self._schedule_hedge(key, func)
+        started = time.perf_counter()
+        try:
+            result = func()
+        except Exception:
+            future = self._finish_primary(hedge)
+            if future is None:
+                raise
+            concurrent.futures.wait([future])
+            if future.exception() is not None:
+                raise
+            self._hedge_won(key)
+            return future.result()
+        future = self._finish_primary(hedge)
+        if future is not None:
+            future.cancel()
+        self.observe(key, time.perf_counter() - started)
+        return result
+
+    async def call_async(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполняет корутину `func` с отправкой второй попытки, если первая не завершилась за задержку раздела
+
+        Args:
+            key: раздел пользовательских данных, по которому считается задержка
+            func: функция без аргументов, возвращающая корутину запроса
+
+        """
+        self._start_request()
+        tasks = [self._create_task(func, self._observer(key))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.delay(key))
+            if done or not self._acquire_hedge():
+                return await tasks[0]
+
+            tasks.append(self._create_task(func))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is tasks[1]:
+                            self._hedge_won(key)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    @staticmethod
+    def _create_task(func: Callable[[], Awaitable[Any]], observer: Callable[[Any], None] = None) -> asyncio.Future:
+        task = asyncio.ensure_future(func())
+        if observer is not None:
+            task.add_done_callback(observer)
+        return task
+
+    @property
+    def stats(self) -> dict:
+        """
+        Статистика дублирующих запросов и текущие задержки по разделам
+        """
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'hedges_sent': self.hedges_sent,
+                'hedges_won': self.hedges_won,
+                'budget_exhausted': self.budget_exhausted,
+                'delays': dict(self._delays),
+            }
@@ -0,0 +1,276 @@
+import logging
+import os
+import threading
+import time
+from typing import *
+
+import OpenSSL.crypto as crypto
+
+import esia_client.log
+import esia_client.signing
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['KeyPair', 'KeyMaterial', 'KeyRegistry', 'default_registry']
+
+
+def _file_stamp(path: str) -> tuple:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class KeyPair:
+    """
+    Загруженные сертификат и приватный ключ клиента с готовым `Signer`
+
+    Экземпляр не изменяется после создания: при перезагрузке файлов создается новый экземпляр,
+    а подписи, начатые со старым, завершаются с ним же.
+    """
+    __slots__ = ('crt_pem', 'pkey_pem', 'crt', 'pkey', 'signer', 'version', 'loaded_at')
+
+    def __init__(self, crt_pem: bytes, pkey_pem: bytes, version: int = 1):
+        """
+        Args:
+            crt_pem: сертификат клиента в формате PEM
+            pkey_pem: приватный ключ клиента в формате PEM
+            version: номер загрузки файлов
+
+        Raises:
+            OpenSSL.crypto.Error: некорректный сертификат или ключ
+        """
+        self.crt_pem = crt_pem
+        self.pkey_pem = pkey_pem
+        self.crt = crypto.load_certificate(crypto.FILETYPE_PEM, crt_pem)
+        self.pkey = crypto.load_privatekey(crypto.FILETYPE_PEM, pkey_pem)
+        self.signer = esia_client.signing.Signer(self.crt, self.pkey)
+        self.version = version
+        self.loaded_at = time.time()
+
+    def matches(self) -> bool:
+        """
+        Соответствует ли приватный ключ открытому ключу сертификата
+        """
+        return (crypto.dump_publickey(crypto.FILETYPE_PEM, self.crt.get_pubkey()) ==
+                crypto.dump_publickey(crypto.FILETYPE_PEM, self.pkey))
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.crt.get_subject().CN!r} version={self.version}>'
+
+
+class KeyMaterial:
+    """
+    Сертификат и приватный ключ из пары файлов, перезагружаемые при изменении файлов
+
+    Текущая пара `current` заменяется одним присваиванием только после успешной загрузки и проверки
+    соответствия ключа сертификату, поэтому подпись не блокируется перезагрузкой, а ошибка в новых
+    файлах (например, при замене сертификата раньше ключа) оставляет в работе прежнюю пару.
+    """
+
+    def __init__(self, cert_file: str, private_key_file: str):
+        """
+        Args:
+            cert_file: путь до сертификата клиента
+            private_key_file: путь до приватного ключа клиента
+
+        Raises:
+            OSError: файлы недоступны
+            OpenSSL.crypto.Error: некорректный сертификат или ключ
+        """
+        self.cert_file = cert_file
+        self.private_key_file = private_key_file
+        self.reloads = 0
+        self.reload_errors = 0
+        self._lock = threading.Lock()
+        self._stamp = self._read_stamp()
+        self._failed_stamp = None
+        self.current = self._load(version=1)
+
+    def _read_stamp(self) -> tuple:
+        return _file_stamp(self.cert_file), _file_stamp(self.private_key_file)
+
+    def _load(self, version: int) -> KeyPair:
+        with open(self.cert_file, 'rb') as cert_file, \
+                open(self.private_key_file, 'rb') as pkey_file:
+            return KeyPair(cert_file.read(), pkey_file.read(), version)
+
+    @property
+    def signer(self) -> esia_client.signing.Signer:
+        return self.current.signer
+
+    def refresh(self) -> bool:
+        """
+        Перезагружает сертификат и ключ, если файлы изменились
+
+        Returns:
+            True, если загружена новая пара
+        """
+        try:
+            stamp = self._read_stamp()
+        except OSError as e:
+            self._reload_failed(None, e)
+            return False
+        if stamp == self._stamp or stamp == self._failed_stamp:
+            return False
+
+        with self._lock:
+            if stamp == self._stamp or stamp == self._failed_stamp:
+                return False
+            try:
+                pair = self._load(self.current.version + 1)
+                if not pair.matches():
+                    raise ValueError('Private key does not match the certificate')
+                if self._read_stamp() != stamp:
+                    # файлы заменяются прямо сейчас, загрузим их при следующей проверке
+                    return False
+            except (OSError, ValueError, crypto.Error) as e:
+                self._reload_failed(stamp, e)
+                return False
+            self._stamp = stamp
+            self._failed_stamp = None
+            self.current = pair
+            self.reloads += 1
+        esia_client.log.log_event(logger, logging.INFO, 'keys.reloaded', 'Certificate %s reloaded, version %d',
+                                  self.cert_file, pair.version, cert_file=self.cert_file, version=pair.version)
+        return True
+
+    def _reload_failed(self, stamp: Optional[tuple], error: Exception):
+        """
+        Учитывает ошибку перезагрузки, об ошибке одних и тех же файлов сообщается один раз
+        """
+        if stamp is None and self._failed_stamp == ():
+            return
+        self._failed_stamp = stamp if stamp is not None else ()
+        self.reload_errors += 1
+        esia_client.log.log_event(logger, logging.WARNING, 'keys.reload_failed',
+                                  'Unable to reload certificate %s: %s', self.cert_file, error,
+                                  cert_file=self.cert_file)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.cert_file!r} version={self.current.version}>'
+
+
+class KeyRegistry:
+    """
+    Общий реестр сертификатов и ключей клиентов ЕСИА
+
+    Настройки с одинаковыми файлами сертификата и ключа используют один `KeyMaterial`, поэтому файлы
+    читаются и разбираются один раз на процесс, независимо от количества клиентов. Фоновый поток
+    (`start`) проверяет время изменения файлов и перезагружает их без перезапуска процесса.
+
+    Пример:
+        registry = KeyRegistry(check_interval=30)
+        registry.start()
+        settings = Settings('client-a', ..., cert_file='a.crt', private_key_file='a.key', key_registry=registry)
+    """
+
+    def __init__(self, check_interval: float = 60):
+        """
+        Args:
+            check_interval: период проверки изменения файлов фоновым потоком в секундах
+
+        """
+        self.check_interval = check_interval
+        self._materials = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _key(cert_file: str, private_key_file: str) -> Tuple[str, str]:
+        # символические ссылки не раскрываются: при ротации секретов подменяется сама ссылка
+        return os.path.abspath(cert_file), os.path.abspath(private_key_file)
+
+    def get(self, cert_file: str, private_key_file: str) -> KeyMaterial:
+        """
+        Возвращает загруженные сертификат и ключ, при первом обращении загружает файлы
+
+        Для уже загруженных файлов проверяется время изменения, чтобы новые настройки
+        не получили устаревшую пару при остановленном фоновом потоке.
+
+        Raises:
+            OSError: файлы недоступны
+            OpenSSL.crypto.Error: некорректный сертификат или ключ
+        """
+        key = self._key(cert_file, private_key_file)
+        material = self._materials.get(key)
+        if material is None:
+            with self._lock:
+                material = self._materials.get(key)
+                if material is None:
+                    material = self._materials[key] = KeyMaterial(*key)
+                    return material
+        material.refresh()
+        return material
+
+    def refresh(self) -> int:
+        """
+        Перезагружает изменившиеся файлы всех загруженных пар
+
+        Returns:
+            количество перезагруженных пар
+        """
+        with self._lock:
+            materials = list(self._materials.values())
+        return sum(material.refresh() for material in materials)
+
+    def _run(self):
+        while not self._stopped.wait(self.check_interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(e, exc_info=True)
+
+    def start(self):
+        """
+        Запускает фоновый поток проверки файлов
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='esia-key-registry', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """
+        Останавливает фоновый поток проверки файлов
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            materials = list(self._materials.values())
+        return {
+            material.cert_file: {
+                'version': material.current.version,
+                'loaded_at': material.current.loaded_at,
+                'reloads': material.reloads,
+                'reload_errors': material.reload_errors,
+            }
+            for material in materials
+        }
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def default_registry() -> KeyRegistry:
+    """
+    Реестр, используемый настройками без явно заданного `key_registry`
+    """
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = KeyRegistry()
+    return _default_registry
@@ -0,0 +1,76 @@
+import logging
+import random
+import threading
+from typing import *
+
+__all__ = ['log_event', 'set_sampling', 'get_sampling', 'token_fingerprint']
+
+_sampling: Dict[str, float] = {}
+_sampling_lock = threading.Lock()
+
+
+def set_sampling(event: str, rate: Optional[float]):
+    """
+    Задает долю записываемых событий журнала
+
+    Сэмплирование применяется к частым событиям на каждый запрос (`http.request`, `http.response`,
+    `rate_limit.delay` и т.п.), чтобы включенный уровень журнала не нагружал приложение.
+
+    Args:
+        event: имя события
+        rate: доля событий от 0 до 1, None отключает сэмплирование события
+
+    Raises:
+        ValueError: доля вне диапазона
+    """
+    with _sampling_lock:
+        if rate is None:
+            _sampling.pop(event, None)
+            return
+        if not 0 <= rate <= 1:
+            raise ValueError(f'Sampling rate must be between 0 and 1, got {rate}')
+        _sampling[event] = rate
+
+
+def get_sampling() -> Dict[str, float]:
+    """
+    Текущие доли записываемых событий
+    """
+    with _sampling_lock:
+        return dict(_sampling)
+
+
+def log_event(logger: logging.Logger, level: int, event: str, msg: str, *args, exc_info=None, **fields):
+    """
+    Записывает структурированное событие журнала
+
+    Сообщение форматируется обработчиком журнала только при записи, если уровень отключен или событие
+    отброшено сэмплированием, вызов не форматирует аргументы. Имя события и поля доступны форматтерам
+    в атрибутах записи `esia_event` и `esia_fields`.
+
+    Args:
+        logger: журнал модуля
+        level: уровень события
+        event: имя события
+        msg: сообщение в формате `%`
+        args: аргументы сообщения
+        exc_info: информация об исключении
+        fields: поля события
+
+    """
+    if not logger.isEnabledFor(level):
+        return
+    rate = _sampling.get(event)
+    if rate is not None and random.random() >= rate:
+        return
+    logger.log(level, msg, *args, exc_info=exc_info, stacklevel=2,
+               extra={'esia_event': event, 'esia_fields': fields})
+
+
+def token_fingerprint(token: Optional[str]) -> Optional[str]:
+    """
+    Короткий отпечаток токена для журнала вместо самого токена
+    """
+    if not token:
+        return None
+    return f'{token[:6]}...({len(token)})'
@@ -0,0 +1,175 @@
+import bisect
+import collections
+import logging
+import threading
+import time
+from typing import *
+
+from esia_client.endpoints import EndpointGroup
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['Histogram', 'MetricEvent', 'Metrics']
+
+
+class Histogram:
+    """
+    Гистограмма длительностей с фиксированными границами интервалов
+    """
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def snapshot(self) -> dict:
+        """
+        Кумулятивные количества наблюдений с длительностью не больше границы интервала
+        """
+        cumulative, total = {}, 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            cumulative[bound] = total
+        return {'buckets': cumulative, 'count': self.count, 'sum': self.sum, 'max': self.max}
+
+
+class MetricEvent(NamedTuple):
+    """
+    Событие метрик, передаваемое подписчикам `Metrics`
+
+    kind: request или signing
+    """
+    kind: str
+    group: Optional[EndpointGroup]
+    duration: float
+    status: Optional[int] = None
+    error: Optional[Exception] = None
+
+
+class _GroupMetrics:
+    def __init__(self, buckets: Sequence[float]):
+        self.latency = Histogram(buckets)
+        self.statuses = collections.Counter()
+        self.exceptions = collections.Counter()
+        self.in_flight = 0
+
+    def snapshot(self) -> dict:
+        return {
+            'latency': self.latency.snapshot(),
+            'statuses': dict(self.statuses),
+            'exceptions': dict(self.exceptions),
+            'in_flight': self.in_flight,
+        }
+
+
+class Metrics:
+    """
+    Метрики запросов к ЕСИА по группам конечных точек и длительности формирования подписи
+
+    Собираются гистограммы длительности запросов, количество ответов по HTTP статусам, количество
+    исключений по типам, количество выполняющихся запросов и гистограмма длительности подписи.
+    Подписчики, добавленные через `add_listener`, получают каждое событие `MetricEvent`.
+    """
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Args:
+            buckets: верхние границы интервалов гистограмм в секундах
+
+        """
+        self.buckets = tuple(buckets)
+        self._groups = {group: _GroupMetrics(self.buckets) for group in EndpointGroup}
+        self._signing = Histogram(self.buckets)
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def add_listener(self, listener: Callable[[MetricEvent], Any]):
+        """
+        Добавляет подписчика на события метрик, исключения подписчика записываются в лог
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[MetricEvent], Any]):
+        self._listeners.remove(listener)
+
+    def _notify(self, event: MetricEvent):
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                logger.error(e, exc_info=True)
+
+    def request_started(self, group: EndpointGroup) -> float:
+        """
+        Отмечает начало запроса
+
+        Returns:
+            Время начала запроса для `request_finished`
+        """
+        with self._lock:
+            self._groups[group].in_flight += 1
+        return time.perf_counter()
+
+    def request_finished(self, group: EndpointGroup, started: float, status: int = None, error: Exception = None):
+        """
+        Отмечает завершение запроса
+
+        Args:
+            group: группа конечных точек
+            started: время начала запроса из `request_started`
+            status: HTTP статус успешного ответа
+            error: исключение, которым завершился запрос
+
+        """
+        duration = time.perf_counter() - started
+        if error is not None and status is None:
+            status = getattr(error, 'status', None)
+        with self._lock:
+            metrics = self._groups[group]
+            metrics.in_flight -= 1
+            metrics.latency.observe(duration)
+            if status is not None:
+                metrics.statuses[status] += 1
+            if error is not None:
+                metrics.exceptions[type(error).__name__] += 1
+        if self._listeners:
+            self._notify(MetricEvent('request', group, duration, status, error))
+
+    def observe_signing(self, duration: float):
+        """
+        Записывает длительность формирования подписи
+        """
+        with self._lock:
+            self._signing.observe(duration)
+        if self._listeners:
+            self._notify(MetricEvent('signing', None, duration))
+
+    def snapshot(self) -> dict:
+        """
+        Агрегированные значения метрик
+        """
+        with self._lock:
+            return {
+                'requests': {str(group): metrics.snapshot() for group, metrics in self._groups.items()},
+                'signing': self._signing.snapshot(),
+            }
+
+    def reset(self):
+        """
+        Сбрасывает накопленные значения, кроме количества выполняющихся запросов
+        """
+        with self._lock:
+            for group, metrics in self._groups.items():
+                in_flight = metrics.in_flight
+                self._groups[group] = _GroupMetrics(self.buckets)
+                self._groups[group].in_flight = in_flight
+            self._signing = Histogram(self.buckets)
@@ -0,0 +1,280 @@
+from typing import *
+
+import esia_client.codec
+
+__all__ = ['Field', 'Model', 'Collection', 'Person', 'Address', 'Addresses', 'Contact', 'Contacts',
+           'Document', 'Documents']
+
+
+class Field:
+    """
+    Поле модели, значение читается из ответа ЕСИА при обращении
+    """
+    __slots__ = ('key', 'name')
+
+    def __init__(self, key: str):
+        """
+        Args:
+            key: имя поля в JSON ответа ЕСИА
+
+        """
+        self.key = key
+        self.name = key
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        return instance._parsed().get(self.key)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {self.name}={self.key!r}>'
+
+
+class Model:
+    """
+    Компактная модель ответа ЕСИА
+
+    Модель хранит ответ в виде байтов JSON и разбирает его только при первом обращении к полям.
+    Разобранный ответ сохраняется до вызова `compact`, поэтому модели в кэше или в очереди занимают
+    примерно столько же памяти, сколько тело ответа. Для совместимости с ответами в виде словарей
+    поддерживаются `model['key']` и `model.get('key')`.
+    """
+    __slots__ = ('_raw', '_data', '_codec')
+
+    def __init__(self, raw: bytes = None, data: dict = None, codec: esia_client.codec.JsonCodec = None):
+        """
+        Args:
+            raw: тело ответа в формате JSON
+            data: разобранный ответ, если тела ответа нет
+            codec: кодек JSON, по умолчанию `esia_client.codec.default_codec()`
+
+        Raises:
+            ValueError: не передано ни тело ответа, ни разобранный ответ
+        """
+        if raw is None and data is None:
+            raise ValueError('Either raw or data is required')
+        self._raw = raw
+        self._data = data
+        self._codec = codec
+
+    @classmethod
+    def from_bytes(cls, raw: bytes, codec: esia_client.codec.JsonCodec = None) -> 'Model':
+        """
+        Модель из тела ответа, ответ не разбирается до обращения к полям
+        """
+        return cls(raw=bytes(raw), codec=codec)
+
+    @classmethod
+    def from_dict(cls, data: dict, codec: esia_client.codec.JsonCodec = None) -> 'Model':
+        """
+        Модель из разобранного ответа, ответ сохраняется в компактном виде
+        """
+        return cls(raw=(codec or esia_client.codec.default_codec()).dumps(data), codec=codec)
+
+    def _parsed(self) -> dict:
+        data = self._data
+        if data is None:
+            data = self._data = (self._codec or esia_client.codec.default_codec()).loads(self._raw)
+        return data
+
+    @property
+    def parsed(self) -> bool:
+        """
+        Ответ разобран и хранится в памяти вместе с байтами
+        """
+        return self._data is not None
+
+    def compact(self):
+        """
+        Освобождает разобранный ответ, оставляя только байты
+        """
+        if self._raw is None:
+            self._raw = self.to_bytes()
+        self._data = None
+
+    def to_bytes(self) -> bytes:
+        """
+        Ответ в формате JSON
+        """
+        if self._raw is None:
+            return (self._codec or esia_client.codec.default_codec()).dumps(self._data)
+        return self._raw
+
+    def to_dict(self) -> dict:
+        """
+        Новая копия ответа в виде словаря
+        """
+        return (self._codec or esia_client.codec.default_codec()).loads(self.to_bytes())
+
+    def __getitem__(self, key: str) -> Any:
+        return self._parsed()[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._parsed()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._parsed().get(key, default)
+
+    def __eq__(self, other):
+        if not isinstance(other, Model):
+            return NotImplemented
+        return type(self) is type(other) and self._parsed() == other._parsed()
+
+    __hash__ = None
+
+    def __getstate__(self):
+        return self.to_bytes()
+
+    def __setstate__(self, state: bytes):
+        self._raw = state
+        self._data = None
+        self._codec = None
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} {len(self.to_bytes())} bytes>'
+
+
+class Collection(Model):
+    """
+    Модель списка ЕСИА, запрошенного со встроенными элементами (`embed=(elements)`)
+
+    Модели элементов создаются при первом обращении к `elements` или переборе коллекции.
+    """
+    __slots__ = ('_elements',)
+    item_model = Model
+
+    size = Field('size')
+
+    def __init__(self, raw: bytes = None, data: dict = None, codec: esia_client.codec.JsonCodec = None):
+        super().__init__(raw=raw, data=data, codec=codec)
+        self._elements = None
+
+    @property
+    def elements(self) -> Tuple[Model, ...]:
+        elements = self._elements
+        if elements is None:
+            elements = self._elements = tuple(self.item_model(data=item, codec=self._codec)
+                                              for item in self._parsed().get('elements') or ())
+        return elements
+
+    def compact(self):
+        super().compact()
+        self._elements = None
+
+    def __setstate__(self, state: bytes):
+        super().__setstate__(state)
+        self._elements = None
+
+    def __iter__(self) -> Iterator[Model]:
+        return iter(self.elements)
+
+    def __len__(self) -> int:
+        return len(self.elements)
+
+    def by_type(self, type: str) -> List[Model]:
+        """
+        Элементы заданного типа
+        """
+        return [element for element in self.elements if element.type == type]
+
+
+class Person(Model):
+    """
+    Общая информация о пользователе (`prns/{oid}`)
+    """
+    __slots__ = ()
+
+    first_name = Field('firstName')
+    last_name = Field('lastName')
+    middle_name = Field('middleName')
+    birth_date = Field('birthDate')
+    birth_place = Field('birthPlace')
+    gender = Field('gender')
+    snils = Field('snils')
+    inn = Field('inn')
+    citizenship = Field('citizenship')
+    trusted = Field('trusted')
+    verifying = Field('verifying')
+    status = Field('status')
+    updated_on = Field('updatedOn')
+    e_tag = Field('eTag')
+
+
+class Address(Model):
+    """
+    Адрес пользователя: регистрации (PRG) или проживания (PLV)
+    """
+    __slots__ = ()
+
+    type = Field('type')
+    address_str = Field('addressStr')
+    zip_code = Field('zipCode')
+    country_id = Field('countryId')
+    region = Field('region')
+    city = Field('city')
+    street = Field('street')
+    house = Field('house')
+    building = Field('building')
+    flat = Field('flat')
+    fias_code = Field('fiasCode')
+    e_tag = Field('eTag')
+
+
+class Addresses(Collection):
+    """
+    Адреса пользователя (`prns/{oid}/addrs`)
+    """
+    __slots__ = ()
+    item_model = Address
+
+
+class Contact(Model):
+    """
+    Контакт пользователя: электронная почта (EML), мобильный (MBT) или домашний (PHN) телефон
+    """
+    __slots__ = ()
+
+    type = Field('type')
+    value = Field('value')
+    verification_status = Field('vrfStu')
+    e_tag = Field('eTag')
+
+    @property
+    def verified(self) -> bool:
+        return self.verification_status == 'VERIFIED'
+
+
+class Contacts(Collection):
+    """
+    Контакты пользователя (`prns/{oid}/ctts`)
+    """
+    __slots__ = ()
+    item_model = Contact
+
+
+class Document(Model):
+    """
+    Документ пользователя (`prns/{oid}/docs/{doc_id}`)
+    """
+    __slots__ = ()
+
+    type = Field('type')
+    series = Field('series')
+    number = Field('number')
+    issue_date = Field('issueDate')
+    issue_id = Field('issueId')
+    issued_by = Field('issuedBy')
+    expiry_date = Field('expiryDate')
+    verification_status = Field('vrfStu')
+    e_tag = Field('eTag')
+
+
+class Documents(Collection):
+    """
+    Документы пользователя (`prns/{oid}/docs`)
+    """
+    __slots__ = ()
+    item_model = Document
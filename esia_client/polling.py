@@ -0,0 +1,317 @@
+import asyncio
+import functools
+import heapq
+import inspect
+import itertools
+import logging
+import random
+import time
+from typing import *
+
+import esia_client.exceptions
+import esia_client.log
+from esia_client.async_client import AsyncEBS
+from esia_client.transport import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['VerificationResult', 'VerificationPoller']
+
+
+class VerificationResult(NamedTuple):
+    """
+    Результат опроса сессии биометрической верификации
+    """
+    session_id: str
+    oid: str
+    payload: Optional[dict]
+    error: Optional[Exception]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class _PendingSession:
+    __slots__ = ('ebs', 'future', 'expires_at', 'delay', 'polls')
+
+    def __init__(self, ebs: AsyncEBS, future: asyncio.Future, expires_at: float, delay: float):
+        self.ebs = ebs
+        self.future = future
+        self.expires_at = expires_at
+        self.delay = delay
+        self.polls = 0
+
+
+class VerificationPoller:
+    """
+    Общий планировщик опроса результатов множества сессий биометрической верификации ЕБС
+
+    Вместо отдельного цикла с ожиданием на каждую сессию один планировщик хранит сроки следующих
+    опросов в куче и опрашивает готовые сессии не более чем `concurrency` запросами одновременно
+    через общий пул соединений `session`. Интервал опроса сессии растет экспоненциально до `max_delay`,
+    со случайной составляющей, чтобы опросы сессий, начатых одновременно, не совпадали.
+
+    Результаты выдаются через future, возвращаемую `add`, через обработчик `on_result`
+    или через асинхронный итератор `results()`, если обработчик не задан. Отмена future исключает
+    сессию из опроса.
+
+    Пример:
+        async with VerificationPoller(session=session, concurrency=32) as poller:
+            for ebs in verifications:
+                poller.add(ebs)
+            async for result in poller.results():
+                ...
+    """
+
+    def __init__(self, session: AsyncSession = None, concurrency: int = 16, initial_delay: float = 2.0,
+                 max_delay: float = 30.0, multiplier: float = 1.5, jitter: float = 0.1, timeout: float = 900.0,
+                 pending_statuses: Iterable[int] = (404, 409, 425),
+                 on_result: Callable[[VerificationResult], Any] = None):
+        """
+        Args:
+            session: HTTP-сессия для клиентов ЕБС, не имеющих собственной сессии
+            concurrency: максимальное количество одновременных запросов результата
+            initial_delay: интервал до первого опроса сессии в секундах
+            max_delay: максимальный интервал опроса сессии в секундах
+            multiplier: множитель интервала после каждого опроса, не вернувшего результат
+            jitter: относительная случайная составляющая интервала
+            timeout: время ожидания результата сессии в секундах
+            pending_statuses: HTTP статусы ответа ЕБС, означающие, что результат еще не готов
+            on_result: обработчик результатов (функция или корутина)
+
+        """
+        self.session = session
+        self.concurrency = concurrency
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.timeout = timeout
+        self.pending_statuses = frozenset(pending_statuses)
+        self.on_result = on_result
+        self.polls = 0
+        self.completed = 0
+        self.failed = 0
+        self._schedule = []
+        self._counter = itertools.count()
+        self._sessions = {}
+        self._in_flight = set()
+        self._results = None
+        self._semaphore = None
+        self._wakeup = None
+        self._task = None
+
+    @property
+    def pending(self) -> int:
+        """
+        Количество сессий, ожидающих результата
+        """
+        return len(self._sessions)
+
+    def add(self, ebs: AsyncEBS, timeout: float = None) -> asyncio.Future:
+        """
+        Добавляет сессию верификации в опрос
+
+        Args:
+            ebs: клиент ЕБС с начатой сессией верификации (`AsyncEBS.start_verification`)
+            timeout: время ожидания результата сессии в секундах, по умолчанию `timeout` планировщика
+
+        Returns:
+            Future с расшифрованным результатом верификации
+
+        Raises:
+            RuntimeError: планировщик не запущен
+            ValueError: сессия верификации не начата
+        """
+        if self._task is None:
+            raise RuntimeError('VerificationPoller is not started')
+        if not ebs.session_id:
+            raise ValueError('Verification session is not started')
+        existing = self._sessions.get(ebs.session_id)
+        if existing is not None:
+            return existing.future
+        if ebs.session is None:
+            ebs.session = self.session
+
+        now = time.monotonic()
+        session = _PendingSession(ebs, asyncio.get_event_loop().create_future(),
+                                  now + (timeout if timeout is not None else self.timeout), self.initial_delay)
+        self._sessions[ebs.session_id] = session
+        session.future.add_done_callback(functools.partial(self._discard, session))
+        self._push(now + self._jittered(self.initial_delay), session)
+        return session.future
+
+    def _discard(self, session: _PendingSession, future: asyncio.Future):
+        """
+        Исключает из опроса сессию, future которой отменена
+        """
+        if not future.cancelled() or self._sessions.get(session.ebs.session_id) is not session:
+            return
+        del self._sessions[session.ebs.session_id]
+        if self.on_result is None and self._results is not None:
+            # будит results(), ожидающий результатов только этой сессии
+            self._results.put_nowait(None)
+
+    def _jittered(self, delay: float) -> float:
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def _push(self, due: float, session: _PendingSession):
+        heapq.heappush(self._schedule, (due, next(self._counter), session))
+        self._wakeup.set()
+
+    async def start(self):
+        """
+        Запускает планировщик в текущем цикле событий
+        """
+        if self._task is None:
+            self._results = asyncio.Queue()
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        """
+        Останавливает планировщик, незавершенные сессии отменяются
+        """
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        for poll in list(self._in_flight):
+            poll.cancel()
+        await asyncio.gather(task, *self._in_flight, return_exceptions=True)
+        for session in self._sessions.values():
+            session.future.cancel()
+        self._sessions.clear()
+        self._schedule.clear()
+        self._results.put_nowait(None)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    async def results(self) -> AsyncIterator[VerificationResult]:
+        """
+        Результаты сессий в порядке завершения
+
+        Итерация завершается, когда не остается ожидающих сессий, или после остановки планировщика.
+        Не используется вместе с обработчиком `on_result`.
+        """
+        while self._results is not None:
+            if self._results.empty() and not self._sessions:
+                return
+            result = await self._results.get()
+            if result is None:
+                if self._task is None:
+                    return
+                continue
+            yield result
+
+    async def _run(self):
+        while True:
+            if not self._schedule:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            due, _, session = self._schedule[0]
+            delay = due - time.monotonic()
+            if delay > 0:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._schedule)
+            if session.future.done():
+                continue
+            await self._semaphore.acquire()
+            poll = asyncio.ensure_future(self._poll(session))
+            self._in_flight.add(poll)
+            poll.add_done_callback(self._in_flight.discard)
+
+    async def _poll(self, session: _PendingSession):
+        try:
+            result = await self._check(session)
+        finally:
+            self._semaphore.release()
+        if result is not None and self.on_result is not None:
+            # обработчик вызывается после освобождения места в опросе, медленный обработчик не задерживает
+            # опрос остальных сессий
+            try:
+                outcome = self.on_result(result)
+                if inspect.isawaitable(outcome):
+                    await outcome
+            except Exception as e:
+                logger.error(e, exc_info=True)
+
+    async def _check(self, session: _PendingSession) -> Optional[VerificationResult]:
+        """
+        Опрашивает сессию и возвращает ее результат или планирует следующий опрос
+        """
+        ebs = session.ebs
+        session.polls += 1
+        self.polls += 1
+        try:
+            payload = ebs._decode_result(await ebs._request_result())
+        except Exception as e:
+            if not self._is_pending(e):
+                return self._finish(session, error=e)
+        else:
+            return self._finish(session, payload=payload)
+
+        now = time.monotonic()
+        if now >= session.expires_at:
+            return self._finish(session, error=esia_client.exceptions.DeadlineExceededError(
+                f'Verification session {ebs.session_id} is not completed after {session.polls} polls'))
+        session.delay = min(self.max_delay, session.delay * self.multiplier)
+        self._push(min(session.expires_at, now + self._jittered(session.delay)), session)
+        return None
+
+    def _is_pending(self, error: Exception) -> bool:
+        """
+        Означает ли ошибка, что результат еще не готов или его стоит запросить повторно
+        """
+        if isinstance(error, KeyError):
+            return True
+        if isinstance(error, esia_client.exceptions.HttpError):
+            return error.status is None or error.status in self.pending_statuses or error.status >= 500
+        return isinstance(error, (esia_client.exceptions.CircuitOpenError, asyncio.TimeoutError, ConnectionError))
+
+    def _finish(self, session: _PendingSession, payload: dict = None,
+                error: Exception = None) -> VerificationResult:
+        ebs = session.ebs
+        self._sessions.pop(ebs.session_id, None)
+        if error is None:
+            self.completed += 1
+        else:
+            self.failed += 1
+        # future могла быть отменена во время запроса, результат все равно выдается обработчику
+        if not session.future.done():
+            if error is None:
+                session.future.set_result(payload)
+            else:
+                session.future.set_exception(error)
+                session.future.exception()
+        esia_client.log.log_event(logger, logging.DEBUG, 'ebs.poll.finished',
+                                  'Verification session %s finished after %d polls', ebs.session_id, session.polls,
+                                  session_id=ebs.session_id, polls=session.polls, ok=error is None)
+
+        result = VerificationResult(ebs.session_id, str(ebs.oid), payload, error)
+        if self.on_result is None:
+            self._results.put_nowait(result)
+        return result
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'pending': self.pending,
+            'in_flight': len(self._in_flight),
+            'polls': self.polls,
+            'completed': self.completed,
+            'failed': self.failed,
+        }
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import *
+
+import esia_client.log
+from esia_client.endpoints import EndpointGroup
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['TokenBucket', 'RateLimiter']
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов по алгоритму token bucket
+
+    Ожидающие запросы резервируют токены в порядке очереди, поэтому один экземпляр можно
+    использовать одновременно из нескольких потоков (`acquire`) и корутин (`acquire_async`).
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        """
+        Args:
+            rate: количество запросов в секунду
+            capacity: максимальный размер всплеска запросов, по умолчанию равен `rate`
+
+        """
+        if rate <= 0:
+            raise ValueError('Rate must be positive')
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.delayed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _reserve(self) -> float:
+        """
+        Резервирует токен и возвращает время, которое нужно подождать до его появления
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            delay = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.acquired += 1
+            if delay:
+                self.delayed += 1
+                self.total_wait += delay
+                self.max_wait = max(self.max_wait, delay)
+            return delay
+
+    def acquire(self) -> float:
+        """
+        Блокирует поток до появления токена
+
+        Returns:
+            Время ожидания в очереди в секундах
+        """
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+        return delay
+
+    async def acquire_async(self) -> float:
+        """
+        Ожидает появления токена, не блокируя цикл событий
+
+        Returns:
+            Время ожидания в очереди в секундах
+        """
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'acquired': self.acquired,
+            'delayed': self.delayed,
+            'total_wait': self.total_wait,
+            'max_wait': self.max_wait,
+        }
+
+
+class RateLimiter:
+    """
+    Ограничитель частоты запросов с отдельными лимитами для групп конечных точек
+
+    Пример:
+        RateLimiter({EndpointGroup.TokenExchange: (10, 20), EndpointGroup.Rest: 50})
+    """
+
+    def __init__(self, limits: Mapping[EndpointGroup, Union[float, Tuple[float, float]]]):
+        """
+        Args:
+            limits: частота запросов в секунду или пара (частота, размер всплеска) для каждой группы,
+                запросы групп без лимита не ограничиваются
+
+        """
+        self.buckets = {}
+        for group, limit in limits.items():
+            rate, capacity = limit if isinstance(limit, tuple) else (limit, None)
+            self.buckets[EndpointGroup(group)] = TokenBucket(rate, capacity)
+
+    def acquire(self, group: EndpointGroup) -> float:
+        """
+        Ожидает разрешения на запрос группы в текущем потоке
+
+        Returns:
+            Время ожидания в очереди в секундах
+        """
+        bucket = self.buckets.get(group)
+        if bucket is None:
+            return 0.0
+        delay = bucket.acquire()
+        if delay:
+            esia_client.log.log_event(logger, logging.DEBUG, 'rate_limit.delay',
+                                      'Request to %s endpoints delayed by rate limiter for %.3fs', group, delay,
+                                      group=str(group), delay=delay)
+        return delay
+
+    async def acquire_async(self, group: EndpointGroup) -> float:
+        """
+        Асинхронно ожидает разрешения на запрос группы
+
+        Returns:
+            Время ожидания в очереди в секундах
+        """
+        bucket = self.buckets.get(group)
+        if bucket is None:
+            return 0.0
+        delay = await bucket.acquire_async()
+        if delay:
+            esia_client.log.log_event(logger, logging.DEBUG, 'rate_limit.delay',
+                                      'Request to %s endpoints delayed by rate limiter for %.3fs', group, delay,
+                                      group=str(group), delay=delay)
+        return delay
+
+    @property
+    def stats(self) -> Dict[str, dict]:
+        """
+        Статистика ожидания по группам конечных точек
+        """
+        return {str(group): bucket.stats for group, bucket in self.buckets.items()}
@@ -0,0 +1,198 @@
+import asyncio
+import contextlib
+import contextvars
+import random
+import sys
+import time
+from typing import *
+
+import esia_client.exceptions
+
+__all__ = ['RetryPolicy', 'Deadline', 'deadline', 'current_deadline']
+
+_deadline = contextvars.ContextVar('esia_deadline', default=None)
+
+
+class RetryPolicy:
+    """
+    Политика повторных запросов при временных ошибках ЕСИА и ЕБС
+
+    Идемпотентные запросы (`idempotent_methods`) и запросы, явно отмеченные безопасными для повтора,
+    повторяются при ошибках соединения, таймаутах и статусах из `statuses`. Остальные запросы повторяются,
+    только если соединение не было установлено и запрос гарантированно не дошел до сервиса.
+    Пауза между попытками растет экспоненциально, со случайной составляющей ("full jitter").
+    """
+
+    def __init__(self, attempts: int = 3, backoff: float = 0.1, max_backoff: float = 2.0, multiplier: float = 2.0,
+                 jitter: bool = True, statuses: Iterable[int] = (500, 502, 503, 504),
+                 idempotent_methods: Iterable[str] = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'),
+                 retry_token_exchange: bool = False):
+        """
+        Args:
+            attempts: максимальное количество попыток, включая первую
+            backoff: пауза перед первым повтором в секундах
+            max_backoff: максимальная пауза между попытками в секундах
+            multiplier: множитель паузы для каждой следующей попытки
+            jitter: выбирать паузу случайно от нуля до расчетного значения
+            statuses: HTTP статусы ответа, при которых запрос повторяется
+            idempotent_methods: HTTP методы, повторяемые без явного разрешения
+            retry_token_exchange: повторять обмен кода авторизации или маркера обновления на токен при любых
+                временных ошибках. Код и маркер одноразовые: если ЕСИА уже обработала запрос, повтор
+                завершится ошибкой invalid_grant вместо исходной, а новый маркер обновления будет потерян
+
+        Raises:
+            ValueError: некорректное количество попыток
+        """
+        if attempts < 1:
+            raise ValueError(f'At least one attempt is required, got {attempts}')
+        self.attempts = attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.statuses = frozenset(statuses)
+        self.idempotent_methods = frozenset(method.upper() for method in idempotent_methods)
+        self.retry_token_exchange = retry_token_exchange
+
+    def delay(self, attempt: int) -> float:
+        """
+        Пауза перед повтором после попытки с номером `attempt` (начиная с 1)
+        """
+        delay = min(self.max_backoff, self.backoff * self.multiplier ** (attempt - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def is_retryable(self, method: str, error: BaseException, retry_safe: bool = False) -> bool:
+        """
+        Можно ли повторить запрос после ошибки
+
+        Args:
+            method: HTTP метод запроса
+            error: ошибка попытки
+            retry_safe: запрос безопасен для повтора независимо от метода
+
+        """
+        idempotent = retry_safe or method.upper() in self.idempotent_methods
+        if isinstance(error, esia_client.exceptions.HttpError):
+            if error.status is not None:
+                return idempotent and error.status in self.statuses
+            error = error.args[0] if error.args else error
+        if not idempotent:
+            return _is_connect_error(error)
+        return isinstance(error, _transient_errors())
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} attempts={self.attempts} backoff={self.backoff}>'
+
+
+def _transient_errors() -> Tuple[type, ...]:
+    """
+    Классы ошибок соединения и таймаутов загруженных HTTP-библиотек
+    """
+    errors = [ConnectionError, TimeoutError, asyncio.TimeoutError]
+    if 'requests' in sys.modules:
+        import requests
+
+        errors.extend((requests.ConnectionError, requests.Timeout))
+    if 'aiohttp' in sys.modules:
+        import aiohttp
+
+        errors.extend((aiohttp.ClientConnectionError, aiohttp.ClientPayloadError))
+    return tuple(errors)
+
+
+def _is_connect_error(error: BaseException) -> bool:
+    """
+    Ошибка установки соединения, после которой запрос точно не был отправлен
+    """
+    if isinstance(error, ConnectionRefusedError):
+        return True
+    if 'requests' in sys.modules:
+        import requests
+        import urllib3
+
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        if isinstance(error, requests.ConnectionError) and error.args:
+            reason = getattr(error.args[0], 'reason', error.args[0])
+            return isinstance(reason, urllib3.exceptions.NewConnectionError)
+    if 'aiohttp' in sys.modules:
+        import aiohttp
+
+        connect_errors = (aiohttp.ClientConnectorError, getattr(aiohttp, 'ConnectionTimeoutError', ()))
+        return isinstance(error, connect_errors) and not isinstance(error, aiohttp.ClientSSLError)
+    return False
+
+
+class Deadline:
+    """
+    Крайний срок выполнения сценария из нескольких запросов
+    """
+    __slots__ = ('expires_at',)
+
+    def __init__(self, timeout: float):
+        """
+        Args:
+            timeout: время на выполнение в секундах
+        """
+        self.expires_at = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        """
+        Оставшееся время в секундах, отрицательное после истечения срока
+        """
+        return self.expires_at - time.monotonic()
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, default: Optional[float] = None) -> float:
+        """
+        Таймаут очередного запроса: `default`, уменьшенный до оставшегося времени
+
+        Raises:
+            DeadlineExceededError: срок истек
+        """
+        remaining = self.remaining()
+        if remaining <= 0:
+            raise esia_client.exceptions.DeadlineExceededError(f'Deadline exceeded by {-remaining:.3f}s')
+        return remaining if default is None else min(default, remaining)
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__} remaining={self.remaining():.3f}s>'
+
+
+def current_deadline() -> Optional[Deadline]:
+    """
+    Крайний срок текущего контекста или None
+    """
+    return _deadline.get()
+
+
+@contextlib.contextmanager
+def deadline(timeout: float) -> Iterator[Deadline]:
+    """
+    Ограничивает общее время выполнения запросов внутри блока
+
+    Срок передается через контекстную переменную, поэтому действует на все шаги сценария, включая запросы
+    в пуле потоков `UserInfo.get_full_profile` и задачах asyncio. Таймаут каждого запроса уменьшается
+    до оставшегося времени, вложенный блок не может продлить внешний срок.
+
+    Пример:
+        with esia_client.retry.deadline(3):
+            user_info = auth.complete_authorization(code, state)
+            profile = user_info.get_full_profile()
+
+    Args:
+        timeout: время на выполнение блока в секундах
+
+    """
+    current = Deadline(timeout)
+    outer = _deadline.get()
+    if outer is not None and outer.expires_at < current.expires_at:
+        current = outer
+    token = _deadline.set(current)
+    try:
+        yield current
+    finally:
+        _deadline.reset(token)
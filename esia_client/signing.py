@@ -0,0 +1,198 @@
+import asyncio
+import base64
+import concurrent.futures
+import logging
+import threading
+import time
+from typing import *
+
+import OpenSSL.crypto as crypto
+
+import esia_client.exceptions
+import esia_client.log
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['Signer', 'SigningPool']
+
+_lib = crypto._lib
+_ffi = crypto._ffi
+
+
+class Signer:
+    """
+    Формирование отсоединенной подписи PKCS#7 для запросов к ЕСИА
+
+    Все создаваемые в OpenSSL структуры освобождаются сразу после формирования подписи.
+    Выходной буфер переиспользуется в пределах потока, поэтому экземпляр можно использовать
+    одновременно из нескольких потоков.
+    """
+    PKCS7_DETACHED = 0x40
+
+    def __init__(self, crt: crypto.X509, pkey: crypto.PKey):
+        """
+        Args:
+            crt: сертификат клиента
+            pkey: приватный ключ клиента
+
+        """
+        self.crt = crt
+        self.pkey = pkey
+        self._x509 = crt._x509
+        self._evp_pkey = pkey._pkey
+        self._local = threading.local()
+
+    def _output_bio(self):
+        bio = getattr(self._local, 'bio', None)
+        if bio is None:
+            bio = _lib.BIO_new(_lib.BIO_s_mem())
+            if bio == _ffi.NULL:
+                raise MemoryError('Unable to allocate BIO')
+            bio = self._local.bio = _ffi.gc(bio, _lib.BIO_free)
+        else:
+            _lib.BIO_reset(bio)
+        return bio
+
+    def sign_bytes(self, content: bytes) -> bytes:
+        """
+        Подписывает данные и возвращает подпись PKCS#7 в формате DER
+
+        Raises:
+            SignatureError: ошибка формирования подписи
+        """
+        bio_in = _lib.BIO_new_mem_buf(content, len(content))
+        if bio_in == _ffi.NULL:
+            raise MemoryError('Unable to allocate BIO')
+        try:
+            pkcs7 = _lib.PKCS7_sign(self._x509, self._evp_pkey, _ffi.NULL, bio_in, self.PKCS7_DETACHED)
+            if pkcs7 == _ffi.NULL:
+                _lib.ERR_clear_error()
+                raise esia_client.exceptions.SignatureError('Unable to sign content')
+            try:
+                bio_out = self._output_bio()
+                if not _lib.i2d_PKCS7_bio(bio_out, pkcs7):
+                    _lib.ERR_clear_error()
+                    raise esia_client.exceptions.SignatureError('Unable to serialize signature')
+                data = _ffi.new('char **')
+                length = _lib.BIO_get_mem_data(bio_out, data)
+                return _ffi.buffer(data[0], length)[:]
+            finally:
+                _lib.PKCS7_free(pkcs7)
+        finally:
+            _lib.BIO_free(bio_in)
+
+    def sign(self, content: str) -> str:
+        """
+        Подписывает строку и возвращает подпись в формате urlsafe base64
+
+        Raises:
+            SignatureError: ошибка формирования подписи
+        """
+        return base64.urlsafe_b64encode(self.sign_bytes(content.encode())).decode()
+
+
+_worker_signer = None
+
+
+def _init_worker(crt_pem: bytes, pkey_pem: bytes):
+    global _worker_signer
+    _worker_signer = Signer(crypto.load_certificate(crypto.FILETYPE_PEM, crt_pem),
+                            crypto.load_privatekey(crypto.FILETYPE_PEM, pkey_pem))
+
+
+def _sign_in_worker(content: str) -> Tuple[str, float]:
+    started = time.time()
+    return _worker_signer.sign(content), started
+
+
+def _sign_in_thread(signer: Signer, content: str) -> Tuple[str, float]:
+    started = time.time()
+    return signer.sign(content), started
+
+
+class SigningPool:
+    """
+    Пул потоков или процессов для формирования подписи вне цикла событий
+
+    Пул процессов позволяет масштабировать подпись на несколько ядер: каждый процесс загружает
+    сертификат и ключ при запуске, после перезагрузки ключей настроек пул процессов пересоздается.
+    """
+
+    def __init__(self, settings, max_workers: int = None, processes: bool = False):
+        """
+        Args:
+            settings: настройки клиента ЕСИА `esia_client.Settings`
+            max_workers: размер пула, по умолчанию определяется `concurrent.futures`
+            processes: использовать пул процессов вместо пула потоков
+
+        """
+        self.settings = settings
+        self.processes = processes
+        self._keys = None
+        if processes:
+            self.executor = self._create_process_pool(max_workers)
+        else:
+            self.executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix='esia-signer',
+            )
+        self.max_workers = self.executor._max_workers
+        self.signatures = 0
+        self.total_queue_time = 0.0
+        self.max_queue_time = 0.0
+        self.last_queue_time = 0.0
+
+    def _create_process_pool(self, max_workers: int = None) -> concurrent.futures.ProcessPoolExecutor:
+        self._keys = keys = self.settings.keys.current
+        return concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers, initializer=_init_worker, initargs=(keys.crt_pem, keys.pkey_pem),
+        )
+
+    def _check_keys(self):
+        """
+        Пересоздает пул процессов, если ключи настроек были перезагружены
+        """
+        if self.settings.keys.current is not self._keys:
+            executor, self.executor = self.executor, self._create_process_pool(self.max_workers)
+            executor.shutdown(wait=False)
+            logger.info('Signing process pool restarted with reloaded keys')
+
+    async def sign(self, content: str) -> str:
+        """
+        Подписывает строку в пуле и возвращает подпись в формате urlsafe base64
+
+        Raises:
+            SignatureError: ошибка формирования подписи
+        """
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        if self.processes:
+            self._check_keys()
+            signature, started = await loop.run_in_executor(self.executor, _sign_in_worker, content)
+        else:
+            signature, started = await loop.run_in_executor(
+                self.executor, _sign_in_thread, self.settings.signer, content,
+            )
+        self._record(max(started - submitted, 0.0))
+        return signature
+
+    def _record(self, queue_time: float):
+        self.signatures += 1
+        self.total_queue_time += queue_time
+        self.max_queue_time = max(self.max_queue_time, queue_time)
+        self.last_queue_time = queue_time
+        esia_client.log.log_event(logger, logging.DEBUG, 'sign.queue', 'Signing request waited %.3fs in the pool queue',
+                                  queue_time, queue_time=queue_time)
+
+    @property
+    def stats(self) -> dict:
+        return {
+            'max_workers': self.max_workers,
+            'processes': self.processes,
+            'signatures': self.signatures,
+            'total_queue_time': self.total_queue_time,
+            'max_queue_time': self.max_queue_time,
+            'last_queue_time': self.last_queue_time,
+        }
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
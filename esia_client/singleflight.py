@@ -0,0 +1,77 @@
+import asyncio
+import concurrent.futures
+import threading
+from typing import *
+
+__all__ = ['SingleFlight', 'AsyncSingleFlight']
+
+
+class SingleFlight:
+    """
+    Объединение одновременных одинаковых вызовов в потоках
+
+    Пока вызов с ключом выполняется, остальные потоки с тем же ключом ожидают и получают
+    его результат или исключение. Результат общий для всех ожидающих, изменять его не следует.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """
+        Выполняет `func` или присоединяется к уже выполняемому вызову с тем же ключом
+
+        Args:
+            key: ключ вызова
+            func: функция без аргументов
+
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = concurrent.futures.Future()
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """
+    Объединение одновременных одинаковых вызовов в корутинах
+
+    Пока вызов с ключом выполняется, остальные корутины с тем же ключом ожидают и получают
+    его результат или исключение. Отмена одного из ожидающих не отменяет общий вызов.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Выполняет `func` или присоединяется к уже выполняемому вызову с тем же ключом
+
+        Args:
+            key: ключ вызова
+            func: функция без аргументов, возвращающая корутину
+
+        """
+        key = (id(asyncio.get_event_loop()), key)
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        return await asyncio.shield(task)
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import threading
+from typing import *
+
+from esia_client.async_client import AsyncAuth, AsyncUserInfo
+from esia_client.client import Auth, UserInfo
+from esia_client.exceptions import TokenExpiredError
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['TokenStore', 'AsyncTokenStore']
+
+
+class _BaseTokenStore:
+    def __init__(self, refresh_margin: float = 60):
+        self.refresh_margin = refresh_margin
+        self.refreshes = 0
+        self._users = {}
+
+    def __len__(self):
+        return len(self._users)
+
+    def __contains__(self, oid):
+        return str(oid) in self._users
+
+    def put(self, user_info: UserInfo):
+        """
+        Сохраняет токены пользователя
+        """
+        self._users[user_info.oid] = user_info
+
+    def remove(self, oid: str):
+        """
+        Удаляет токены пользователя
+        """
+        self._users.pop(str(oid), None)
+
+    def _needs_refresh(self, user_info: UserInfo) -> bool:
+        expires_in = user_info.expires_in()
+        return expires_in is not None and expires_in <= self.refresh_margin
+
+    def _check_refreshable(self, user_info: UserInfo) -> bool:
+        """
+        Проверяет, можно ли обновить токен пользователя
+
+        Raises:
+            TokenExpiredError: токен истек, а маркера обновления нет
+        """
+        if user_info.refresh_token:
+            return True
+        if user_info.expires_in() <= 0:
+            raise TokenExpiredError(f'Access token of user {user_info.oid} expired and cannot be refreshed')
+        return False
+
+    def _store_refreshed(self, user_info: UserInfo, refreshed: UserInfo) -> UserInfo:
+        if refreshed.refresh_token is None:
+            refreshed.refresh_token = user_info.refresh_token
+        self._users[user_info.oid] = refreshed
+        self.refreshes += 1
+        logger.info('Refreshed access token of user %s', user_info.oid)
+        return refreshed
+
+
+class TokenStore(_BaseTokenStore):
+    """
+    Хранилище токенов пользователей с обновлением токена заранее, до истечения срока действия
+
+    Одновременные обновления токена одного пользователя из разных потоков выполняются одним запросом.
+    """
+
+    def __init__(self, auth: Auth, refresh_margin: float = 60):
+        """
+        Args:
+            auth: клиент авторизации ЕСИА
+            refresh_margin: за сколько секунд до истечения обновлять токен
+
+        """
+        super().__init__(refresh_margin)
+        self.auth = auth
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, oid: str) -> Optional[UserInfo]:
+        """
+        Возвращает клиент получения данных пользователя с действующим токеном, при необходимости
+        обновляя токен
+
+        Raises:
+            TokenExpiredError: токен истек, а маркера обновления нет
+            HttpError: ошибка сети или сервера при обновлении токена
+        """
+        oid = str(oid)
+        user_info = self._users.get(oid)
+        if user_info is None or not self._needs_refresh(user_info):
+            return user_info
+
+        with self._lock:
+            lock = self._locks.setdefault(oid, threading.Lock())
+        with lock:
+            user_info = self._users.get(oid)
+            if user_info is not None and self._needs_refresh(user_info) and self._check_refreshable(user_info):
+                refreshed = self.auth.refresh_authorization(user_info.refresh_token, oid=oid)
+                user_info = self._store_refreshed(user_info, refreshed)
+        return user_info
+
+    def remove(self, oid: str):
+        super().remove(oid)
+        with self._lock:
+            self._locks.pop(str(oid), None)
+
+    def refresh_expiring(self) -> int:
+        """
+        Обновляет все токены, срок действия которых истекает в пределах `refresh_margin`
+
+        Returns:
+            Количество обновленных токенов
+        """
+        refreshed = 0
+        for oid, user_info in list(self._users.items()):
+            if not self._needs_refresh(user_info):
+                continue
+            try:
+                if self.get(oid) is not user_info:
+                    refreshed += 1
+            except Exception as e:
+                logger.warning('Failed to refresh access token of user %s: %r', oid, e)
+        return refreshed
+
+
+class AsyncTokenStore(_BaseTokenStore):
+    """
+    Асинхронное хранилище токенов пользователей с обновлением токена заранее, до истечения срока действия
+
+    Одновременные обновления токена одного пользователя выполняются одним запросом.
+    """
+
+    def __init__(self, auth: AsyncAuth, refresh_margin: float = 60):
+        """
+        Args:
+            auth: асинхронный клиент авторизации ЕСИА
+            refresh_margin: за сколько секунд до истечения обновлять токен
+
+        """
+        super().__init__(refresh_margin)
+        self.auth = auth
+        self._refreshing = {}
+
+    async def get(self, oid: str) -> Optional[AsyncUserInfo]:
+        """
+        Возвращает клиент получения данных пользователя с действующим токеном, при необходимости
+        обновляя токен
+
+        Raises:
+            TokenExpiredError: токен истек, а маркера обновления нет
+            HttpError: ошибка сети или сервера при обновлении токена
+        """
+        oid = str(oid)
+        user_info = self._users.get(oid)
+        if user_info is None or not self._needs_refresh(user_info) or not self._check_refreshable(user_info):
+            return user_info
+
+        task = self._refreshing.get(oid)
+        if task is None:
+            task = self._refreshing[oid] = asyncio.ensure_future(self._refresh(user_info))
+            task.add_done_callback(lambda _: self._refreshing.pop(oid, None))
+        return await asyncio.shield(task)
+
+    async def _refresh(self, user_info: AsyncUserInfo) -> AsyncUserInfo:
+        refreshed = await self.auth.refresh_authorization(user_info.refresh_token, oid=user_info.oid)
+        return self._store_refreshed(user_info, refreshed)
+
+    async def refresh_expiring(self) -> int:
+        """
+        Обновляет все токены, срок действия которых истекает в пределах `refresh_margin`
+
+        Returns:
+            Количество обновленных токенов
+        """
+        expiring = [(oid, user_info) for oid, user_info in self._users.items() if self._needs_refresh(user_info)]
+        results = await asyncio.gather(*(self.get(oid) for oid, _ in expiring), return_exceptions=True)
+        refreshed = 0
+        for (oid, user_info), result in zip(expiring, results):
+            if isinstance(result, Exception):
+                logger.warning('Failed to refresh access token of user %s: %r', oid, result)
+            elif result is not user_info:
+                refreshed += 1
+        return refreshed
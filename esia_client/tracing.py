@@ -0,0 +1,196 @@
+import contextlib
+import contextvars
+import logging
+import time
+import uuid
+from typing import *
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['Span', 'Tracer', 'current_correlation_id']
+
+_correlation_id = contextvars.ContextVar('esia_correlation_id', default=None)
+
+
+def current_correlation_id() -> Optional[str]:
+    """
+    Идентификатор корреляции текущего сценария или None вне сценария
+    """
+    return _correlation_id.get()
+
+
+class Span:
+    """
+    Фаза выполнения запроса или сценария
+    """
+    __slots__ = ('name', 'correlation_id', 'attributes', 'started', 'finished', 'error')
+
+    def __init__(self, name: str, correlation_id: str = None, attributes: dict = None):
+        self.name = name
+        self.correlation_id = correlation_id
+        self.attributes = attributes or {}
+        self.started = time.perf_counter()
+        self.finished = None
+        self.error = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        return self.finished - self.started if self.finished is not None else None
+
+    def __repr__(self):
+        return f'<Span {self.name} {self.correlation_id} duration={self.duration}>'
+
+
+class Tracer:
+    """
+    Трассировка фаз запросов к ЕСИА
+
+    Фазы синхронного запроса: http.request (соединение, отправка и ожидание заголовков ответа),
+    http.read_body, json.decode. Асинхронный клиент дополнительно сообщает фазы dns, connect
+    (TCP и TLS) и connection.queue через `aiohttp.TraceConfig`. Сценарии авторизации добавляют фазы
+    sign и jwt.decode. Все фазы одного сценария имеют общий идентификатор корреляции.
+
+    Пример:
+        tracer = Tracer()
+        tracer.add_hook(on_end=lambda span: log.info('%s %s %.3f', span.correlation_id, span.name, span.duration))
+        settings = Settings(..., tracer=tracer)
+        with tracer.flow():
+            user_info = auth.complete_authorization(code)
+            user_info.get_full_profile()
+    """
+
+    def __init__(self):
+        self._start_hooks = []
+        self._end_hooks = []
+
+    def add_hook(self, on_start: Callable[[Span], Any] = None, on_end: Callable[[Span], Any] = None):
+        """
+        Добавляет обработчики начала и завершения фаз
+        """
+        if on_start is not None:
+            self._start_hooks.append(on_start)
+        if on_end is not None:
+            self._end_hooks.append(on_end)
+
+    @staticmethod
+    def _call(hooks: list, span: Span):
+        for hook in hooks:
+            try:
+                hook(span)
+            except Exception as e:
+                logger.error(e, exc_info=True)
+
+    @contextlib.contextmanager
+    def flow(self, correlation_id: str = None) -> Iterator[str]:
+        """
+        Сценарий с общим идентификатором корреляции
+
+        Вложенный сценарий без явного идентификатора продолжает внешний.
+        """
+        current = _correlation_id.get()
+        if correlation_id is None and current is not None:
+            yield current
+            return
+        token = _correlation_id.set(correlation_id or uuid.uuid4().hex)
+        try:
+            yield _correlation_id.get()
+        finally:
+            _correlation_id.reset(token)
+
+    def start_span(self, name: str, **attributes) -> Span:
+        span = Span(name, _correlation_id.get(), attributes)
+        if self._start_hooks:
+            self._call(self._start_hooks, span)
+        return span
+
+    def end_span(self, span: Span, error: BaseException = None):
+        span.finished = time.perf_counter()
+        span.error = error
+        if self._end_hooks:
+            self._call(self._end_hooks, span)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """
+        Фаза выполнения в виде контекстного менеджера
+        """
+        span = self.start_span(name, **attributes)
+        try:
+            yield span
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        self.end_span(span)
+
+    def trace_config(self) -> 'aiohttp.TraceConfig':
+        """
+        Конфигурация трассировки aiohttp для фаз dns, connect, connection.queue и http.request
+        """
+        import aiohttp
+
+        config = aiohttp.TraceConfig()
+
+        def phase(name: str, start_signal, end_signal):
+            async def on_start(session, ctx, params):
+                if not hasattr(ctx, 'spans'):
+                    ctx.spans = {}
+                ctx.spans[name] = self.start_span(name, **_trace_attributes(params))
+
+            async def on_end(session, ctx, params):
+                span = getattr(ctx, 'spans', {}).pop(name, None)
+                if span is not None:
+                    self.end_span(span)
+
+            start_signal.append(on_start)
+            end_signal.append(on_end)
+
+        phase('connection.queue', config.on_connection_queued_start, config.on_connection_queued_end)
+        phase('connect', config.on_connection_create_start, config.on_connection_create_end)
+        phase('dns', config.on_dns_resolvehost_start, config.on_dns_resolvehost_end)
+        phase('http.request', config.on_request_start, config.on_request_end)
+
+        async def on_request_exception(session, ctx, params):
+            for span in getattr(ctx, 'spans', {}).values():
+                self.end_span(span, params.exception)
+            ctx.spans = {}
+
+        config.on_request_exception.append(on_request_exception)
+        return config
+
+
+def _trace_attributes(params) -> dict:
+    attributes = {}
+    for name in ('method', 'url', 'host'):
+        value = getattr(params, name, None)
+        if value is not None:
+            attributes[name] = str(value)
+    response = getattr(params, 'response', None)
+    if response is not None:
+        attributes['status'] = response.status
+    return attributes
+
+
+@contextlib.contextmanager
+def _no_span(*args, **kwargs):
+    yield None
+
+
+def span(tracer: Optional[Tracer], name: str, **attributes) -> ContextManager[Optional[Span]]:
+    """
+    Фаза выполнения `tracer` или пустой контекстный менеджер, если трассировка отключена
+    """
+    if tracer is None:
+        return _no_span()
+    return tracer.span(name, **attributes)
+
+
+def flow(tracer: Optional[Tracer]) -> ContextManager[Optional[str]]:
+    """
+    Сценарий `tracer` или пустой контекстный менеджер, если трассировка отключена
+    """
+    if tracer is None:
+        return _no_span()
+    return tracer.flow()
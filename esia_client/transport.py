@@ -0,0 +1,108 @@
+import http.cookiejar
+import logging
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import aiohttp
+    import requests
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['create_session', 'AsyncSession']
+
+
+def create_session(pool_connections: int = 10, pool_maxsize: int = 10,
+                   pool_block: bool = False, keep_alive: bool = True) -> 'requests.Session':
+    """
+    Создает HTTP-сессию с пулом keep-alive соединений
+
+    Сессия может использоваться совместно несколькими потоками: пул соединений urllib3 потокобезопасен,
+    а состояние сессии после создания не изменяется. Cookies ответов не сохраняются, чтобы сессия,
+    общая для запросов разных пользователей, не передавала cookie одного пользователя в запросах другого.
+
+    Args:
+        pool_connections: количество пулов соединений (хостов), сохраняемых в сессии
+        pool_maxsize: максимальное количество соединений к одному хосту
+        pool_block: ожидать освобождения соединения при исчерпании пула вместо открытия нового
+        keep_alive: переиспользовать соединения между запросами
+
+    """
+    import requests
+    import requests.adapters
+
+    session = requests.Session()
+    session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_connections,
+                                            pool_maxsize=pool_maxsize,
+                                            pool_block=pool_block)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    if not keep_alive:
+        session.headers['Connection'] = 'close'
+    logger.debug('Created HTTP session with pool size %d per host', pool_maxsize)
+    return session
+
+
+class AsyncSession:
+    """
+    Долгоживущая асинхронная HTTP-сессия, общая для AsyncAuth, AsyncUserInfo и AsyncEBS
+
+    Пример:
+        async with AsyncSession(settings) as session:
+            auth = AsyncAuth(settings, session=session)
+    """
+
+    def __init__(self, settings):
+        """
+        Args:
+            settings: настройки клиента ЕСИА `esia_client.Settings`
+        """
+        self.settings = settings
+        self._client_session = None
+
+    @property
+    def client_session(self) -> 'aiohttp.ClientSession':
+        """
+        Открытая сессия aiohttp
+
+        Raises:
+            RuntimeError: сессия не открыта
+        """
+        if self._client_session is None or self._client_session.closed:
+            raise RuntimeError('AsyncSession is not opened')
+        return self._client_session
+
+    async def open(self) -> 'aiohttp.ClientSession':
+        """
+        Открывает сессию с пулом соединений по настройкам клиента
+        """
+        import aiohttp
+
+        if self._client_session is None or self._client_session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.settings.connector_limit,
+                limit_per_host=self.settings.connector_limit_per_host,
+                ttl_dns_cache=self.settings.dns_cache_ttl,
+                keepalive_timeout=self.settings.keepalive_timeout,
+            )
+            trace_configs = [self.settings.tracer.trace_config()] if self.settings.tracer is not None else None
+            # сессия общая для запросов разных пользователей, cookies ответов не сохраняются
+            self._client_session = aiohttp.ClientSession(connector=connector, trace_configs=trace_configs,
+                                                         cookie_jar=aiohttp.DummyCookieJar())
+            logger.debug('Opened async HTTP session with connection limit %d', self.settings.connector_limit)
+        return self._client_session
+
+    async def close(self):
+        """
+        Закрывает сессию и все открытые соединения
+        """
+        session, self._client_session = self._client_session, None
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def __aenter__(self):
+        await self.open()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
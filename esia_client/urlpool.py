@@ -0,0 +1,188 @@
+import collections
+import logging
+import threading
+import time
+import uuid
+from typing import *
+
+from esia_client.client import Auth, Scope
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['PresignedUrl', 'AuthUrlPool']
+
+
+class PresignedUrl(NamedTuple):
+    """
+    Подписанная заранее ссылка авторизации
+    """
+    url: str
+    state: str
+    created_at: float
+
+
+class AuthUrlPool:
+    """
+    Пул заранее подписанных ссылок авторизации
+
+    Фоновый поток поддерживает для каждого набора разрешений и ссылки переадресации заданное
+    количество подписанных ссылок со свежим `state`. Ссылки старше `max_age` отбрасываются,
+    чтобы временная метка запроса не вышла за допустимое ЕСИА отклонение.
+
+    Пример:
+        pool = AuthUrlPool(auth, size=50)
+        pool.register(scopes=[Scope.Authorization, Scope.Fullname])
+        pool.start()
+        url, state, _ = pool.pop(scopes=[Scope.Authorization, Scope.Fullname])
+    """
+
+    def __init__(self, auth: Auth, size: int = 20, max_age: float = 60, refill_interval: float = 1):
+        """
+        Args:
+            auth: клиент авторизации ЕСИА
+            size: количество готовых ссылок для каждого набора параметров
+            max_age: максимальный возраст ссылки в секундах
+            refill_interval: период проверки и пополнения пула в секундах
+
+        """
+        self.auth = auth
+        self.size = size
+        self.max_age = max_age
+        self.refill_interval = refill_interval
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._pools = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def _key(scopes: Iterable[Scope] = None, redirect_uri=None) -> tuple:
+        return tuple(str(x) for x in scopes) if scopes else None, str(redirect_uri) if redirect_uri else None
+
+    def register(self, scopes: Iterable[Scope] = None, redirect_uri=None):
+        """
+        Добавляет набор параметров, для которого нужно поддерживать готовые ссылки
+
+        Args:
+            scopes: разрешения на действия с данными учетной записи `esia_client.Scope`
+            redirect_uri: ссылка для перенаправления пользователя после авторизации
+
+        """
+        with self._lock:
+            self._pools.setdefault(self._key(scopes, redirect_uri), collections.deque())
+        self._wakeup.set()
+
+    def unregister(self, scopes: Iterable[Scope] = None, redirect_uri=None) -> bool:
+        """
+        Прекращает поддержку готовых ссылок для набора параметров, готовые ссылки удаляются
+
+        Returns:
+            True, если набор параметров был зарегистрирован
+        """
+        with self._lock:
+            return self._pools.pop(self._key(scopes, redirect_uri), None) is not None
+
+    def _create(self, key: tuple) -> PresignedUrl:
+        scopes, redirect_uri = key
+        state = str(uuid.uuid4())
+        created_at = time.monotonic()
+        url = self.auth.get_auth_url(state=state, redirect_uri=redirect_uri, scopes=scopes)
+        return PresignedUrl(url, state, created_at)
+
+    def pop(self, scopes: Iterable[Scope] = None, redirect_uri=None) -> PresignedUrl:
+        """
+        Возвращает готовую ссылку авторизации, при пустом пуле подписывает новую ссылку
+
+        Ссылки для параметров, не добавленных через `register`, подписываются при вызове и в пуле
+        не накапливаются, поэтому уникальные ссылки переадресации не увеличивают фоновую нагрузку.
+
+        Args:
+            scopes: разрешения на действия с данными учетной записи `esia_client.Scope`
+            redirect_uri: ссылка для перенаправления пользователя после авторизации
+
+        """
+        key = self._key(scopes, redirect_uri)
+        deadline = time.monotonic() - self.max_age
+        with self._lock:
+            pool = self._pools.get(key, ())
+            while pool:
+                item = pool.popleft()
+                if item.created_at > deadline:
+                    self.hits += 1
+                    break
+                self.expired += 1
+            else:
+                item = None
+                self.misses += 1
+        self._wakeup.set()
+        if item is None:
+            logger.debug('Auth URL pool is empty for %s, signing synchronously', key)
+            item = self._create(key)
+        return item
+
+    def fill(self):
+        """
+        Удаляет устаревшие ссылки и пополняет пул до заданного размера
+        """
+        deadline = time.monotonic() - self.max_age
+        with self._lock:
+            keys = list(self._pools)
+        for key in keys:
+            with self._lock:
+                pool = self._pools.get(key)
+                if pool is None:
+                    continue
+                while pool and pool[0].created_at <= deadline:
+                    pool.popleft()
+                    self.expired += 1
+                missing = self.size - len(pool)
+            for _ in range(missing):
+                if self._stopped.is_set():
+                    return
+                item = self._create(key)
+                with self._lock:
+                    pool.append(item)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                self.fill()
+            except Exception as e:
+                logger.error(e, exc_info=True)
+            self._wakeup.wait(self.refill_interval)
+            self._wakeup.clear()
+
+    def start(self):
+        """
+        Запускает фоновый поток пополнения пула
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='esia-auth-url-pool', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = None):
+        """
+        Останавливает фоновый поток пополнения пула
+        """
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def stats(self) -> dict:
+        with self._lock:
+            sizes = {key: len(pool) for key, pool in self._pools.items()}
+        return {'sizes': sizes, 'hits': self.hits, 'misses': self.misses, 'expired': self.expired}
@@ -1,29 +1,50 @@
+import asyncio
 import base64
 import datetime
-import json
 import logging
+import time
 import urllib.parse
+from typing import TYPE_CHECKING, Optional, Tuple
 
 import OpenSSL.crypto as crypto
-import aiohttp
 import pytz
-import requests
 
+import esia_client.codec
+import esia_client.endpoints
 import esia_client.exceptions
+import esia_client.log
+import esia_client.retry
+import esia_client.signing
+import esia_client.tracing
+
+if TYPE_CHECKING:
+    import aiohttp
+    import requests
 
 logger = logging.getLogger(__name__)
 
 
 class FoundLocation(esia_client.exceptions.EsiaError):
-    def __init__(self, location: str, *args, **kwargs):
+    def __init__(self, location: str, *args, status: int = None, **kwargs):
         super().__init__(*args, kwargs)
         self.location = location
+        self.status = status
 
 
-def make_request(url: str, method: str = 'GET', **kwargs) -> dict:
+def make_request(url: str, method: str = 'GET', session: 'requests.Session' = None, settings=None,
+                 retry_safe: bool = False, **kwargs) -> dict:
     """
     Делает запрос по указанному URL с параметрами и возвращает словарь из JSON-ответа
 
+    Таймаут запроса уменьшается до времени, оставшегося до крайнего срока `esia_client.retry.deadline`.
+
+    Args:
+        url: URL запроса
+        method: HTTP метод запроса
+        session: HTTP-сессия с пулом соединений, без нее для каждого запроса открывается новое соединение
+        settings: настройки клиента ЕСИА `esia_client.Settings` (ограничение частоты, метрики, трассировка, повторы)
+        retry_safe: запрос безопасен для повтора по `Settings.retry_policy`, даже если метод не идемпотентный
+
     Keyword Args:
         headers: Request HTTP Headers
         params: URI HTTP request params
@@ -33,32 +54,166 @@ def make_request(url: str, method: str = 'GET', **kwargs) -> dict:
     Raises:
         HttpError: Ошибка сети или вебсервера
         IncorrectJsonError: Ошибка парсинга JSON-ответа
+        DeadlineExceededError: истек крайний срок выполнения
+    """
+    if settings is None:
+        return _send_request(url, method, session, **_with_deadline(kwargs))[1]
+
+    tracer = settings.tracer
+    kwargs['codec'] = settings.json_codec
+    with esia_client.tracing.flow(tracer):
+        group = esia_client.endpoints.resolve_group(url)
+        attempt = 1
+        while True:
+            try:
+                return _attempt_request(url, method, session, settings, group, **kwargs)
+            except Exception as e:
+                delay = _retry_delay(settings.retry_policy, attempt, url, method, e, retry_safe)
+                if delay is None:
+                    _check_deadline(e)
+                    raise
+            with esia_client.tracing.span(tracer, 'retry.backoff', attempt=attempt):
+                time.sleep(delay)
+            attempt += 1
+
+
+def _attempt_request(url: str, method: str, session: Optional['requests.Session'], settings,
+                     group: esia_client.endpoints.EndpointGroup, **kwargs) -> dict:
+    tracer = settings.tracer
+    breaker = settings.circuit_breaker
+    permit = breaker.before_call(group) if breaker is not None else None
+    try:
+        if settings.rate_limiter is not None:
+            with esia_client.tracing.span(tracer, 'rate_limit', group=str(group)):
+                settings.rate_limiter.acquire(group)
+        kwargs = _with_deadline(kwargs)
+    except BaseException:
+        # запрос не отправлен, пробное разрешение полуоткрытого выключателя возвращается
+        if breaker is not None:
+            breaker.release(group, permit)
+        raise
+
+    metrics = settings.metrics
+    if metrics is None and breaker is None:
+        return _send_request(url, method, session, tracer, **kwargs)[1]
+
+    started = metrics.request_started(group) if metrics is not None else time.perf_counter()
+    try:
+        status, response_json = _send_request(url, method, session, tracer, **kwargs)
+    except FoundLocation as e:
+        _request_finished(settings, group, started, permit, status=e.status)
+        raise
+    except BaseException as e:
+        _request_finished(settings, group, started, permit, error=e)
+        raise
+    _request_finished(settings, group, started, permit, status=status)
+    return response_json
+
+
+def _request_finished(settings, group: esia_client.endpoints.EndpointGroup, started: float, permit: Optional[int],
+                      status: int = None, error: BaseException = None):
+    """
+    Учитывает результат попытки в метриках и автоматическом выключателе
+    """
+    if settings.metrics is not None:
+        settings.metrics.request_finished(group, started, status=status, error=error)
+    if settings.circuit_breaker is not None:
+        settings.circuit_breaker.record(group, time.perf_counter() - started, error, permit)
+
+
+def _with_deadline(kwargs: dict) -> dict:
+    """
+    Параметры запроса с таймаутом, уменьшенным до времени, оставшегося до крайнего срока
+    """
+    deadline = esia_client.retry.current_deadline()
+    if deadline is None:
+        return kwargs
+    timeout = kwargs.get('timeout')
+    return {**kwargs, 'timeout': deadline.timeout(timeout if isinstance(timeout, (int, float)) else None)}
+
+
+def _check_deadline(error: Exception):
+    """
+    Заменяет ошибку запроса, прерванного по истечении крайнего срока, на DeadlineExceededError
+    """
+    deadline = esia_client.retry.current_deadline()
+    if deadline is not None and deadline.expired and \
+            not isinstance(error, esia_client.exceptions.DeadlineExceededError):
+        raise esia_client.exceptions.DeadlineExceededError(f'Deadline exceeded: {error}') from error
+
+
+def _retry_delay(policy: Optional['esia_client.retry.RetryPolicy'], attempt: int, url: str, method: str,
+                 error: Exception, retry_safe: bool) -> Optional[float]:
+    """
+    Пауза перед повтором запроса или None, если запрос не повторяется
     """
+    if policy is None or attempt >= policy.attempts or not policy.is_retryable(method, error, retry_safe):
+        return None
+    delay = policy.delay(attempt)
+    deadline = esia_client.retry.current_deadline()
+    if deadline is not None and deadline.remaining() <= delay:
+        return None
+    esia_client.log.log_event(logger, logging.WARNING, 'retry', 'Retrying %s request to %s in %.3fs after %s: %s',
+                              method, url, delay, type(error).__name__, error,
+                              method=method, url=url, attempt=attempt, delay=delay)
+    return delay
+
+
+def _send_request(url: str, method: str, session: 'requests.Session' = None,
+                  tracer: 'esia_client.tracing.Tracer' = None, codec: 'esia_client.codec.JsonCodec' = None,
+                  **kwargs) -> Tuple[int, dict]:
+    import requests
+
+    codec = codec or esia_client.codec.default_codec()
+    if tracer is not None:
+        # тело читается отдельно от заголовков для фазы http.read_body
+        kwargs.setdefault('stream', True)
+    response = None
     try:
-        response = requests.request(method, url, **kwargs)
-        logger.debug(f'Status {response.status_code} from {method} request to {url} with {kwargs}')
+        with esia_client.tracing.span(tracer, 'http.request', method=method, url=url):
+            response = (session or requests).request(method, url, **kwargs)
+        esia_client.log.log_event(logger, logging.DEBUG, 'http.response', 'Status %s from %s request to %s',
+                                  response.status_code, method, url,
+                                  status=response.status_code, method=method, url=url)
         response.raise_for_status()
         if response.status_code in (200, 302) and response.headers.get('Location'):
-            raise FoundLocation(location=response.headers.get('Location'))
+            raise FoundLocation(location=response.headers.get('Location'), status=response.status_code)
         elif not response.headers['Content-type'].startswith('application/json'):
-            logger.error(f'{response.headers["Content-type"]} -> {response.text}')
+            logger.error('Unexpected content type %s from %s: %.200r', response.headers['Content-type'], url,
+                         response.content)
             raise esia_client.exceptions.IncorrectJsonError(
                 f'Invalid content type -> {response.headers["content-type"]}'
             )
-        return response.json()
+        with esia_client.tracing.span(tracer, 'http.read_body'):
+            body = response.content
+        with esia_client.tracing.span(tracer, 'json.decode'):
+            return response.status_code, codec.loads(body)
     except requests.HTTPError as e:
         logger.error(e, exc_info=True)
         raise esia_client.exceptions.HttpError(e)
     except ValueError as e:
         logger.error(e, exc_info=True)
         raise esia_client.exceptions.IncorrectJsonError(e)
+    finally:
+        # непрочитанный потоковый ответ иначе не возвращает соединение в пул
+        if response is not None:
+            response.close()
 
 
-async def make_async_request(
-        url: str, method: str = 'GET', **kwargs) -> dict:
+async def make_async_request(url: str, method: str = 'GET', session: 'aiohttp.ClientSession' = None, settings=None,
+                             retry_safe: bool = False, **kwargs) -> dict:
     """
     Делает асинхронный запрос по указанному URL с параметрами и возвращает словарь из JSON-ответа
 
+    Таймаут запроса уменьшается до времени, оставшегося до крайнего срока `esia_client.retry.deadline`.
+
+    Args:
+        url: URL запроса
+        method: HTTP метод запроса
+        session: открытая сессия aiohttp, без нее для запроса создается временная сессия
+        settings: настройки клиента ЕСИА `esia_client.Settings` (ограничение частоты, метрики, трассировка, повторы)
+        retry_safe: запрос безопасен для повтора по `Settings.retry_policy`, даже если метод не идемпотентный
+
     Keyword Args:
         headers: Request HTTP Headers
         params: URI HTTP request params
@@ -68,22 +223,93 @@ async def make_async_request(
     Raises:
         HttpError: Ошибка сети или вебсервера
         IncorrectJsonError: Ошибка парсинга JSON-ответа
+        DeadlineExceededError: истек крайний срок выполнения
     """
+    if session is None:
+        import aiohttp
+
+        async with aiohttp.ClientSession() as session:
+            return await make_async_request(url, method, session=session, settings=settings, retry_safe=retry_safe,
+                                            **kwargs)
+
+    if settings is None:
+        return (await _send_async_request(url, method, session, **_with_deadline(kwargs)))[1]
+
+    tracer = settings.tracer
+    kwargs['codec'] = settings.json_codec
+    with esia_client.tracing.flow(tracer):
+        group = esia_client.endpoints.resolve_group(url)
+        attempt = 1
+        while True:
+            try:
+                return await _attempt_async_request(url, method, session, settings, group, **kwargs)
+            except Exception as e:
+                delay = _retry_delay(settings.retry_policy, attempt, url, method, e, retry_safe)
+                if delay is None:
+                    _check_deadline(e)
+                    raise
+            with esia_client.tracing.span(tracer, 'retry.backoff', attempt=attempt):
+                await asyncio.sleep(delay)
+            attempt += 1
+
+
+async def _attempt_async_request(url: str, method: str, session: 'aiohttp.ClientSession', settings,
+                                 group: esia_client.endpoints.EndpointGroup, **kwargs) -> dict:
+    tracer = settings.tracer
+    breaker = settings.circuit_breaker
+    permit = breaker.before_call(group) if breaker is not None else None
+    try:
+        if settings.rate_limiter is not None:
+            with esia_client.tracing.span(tracer, 'rate_limit', group=str(group)):
+                await settings.rate_limiter.acquire_async(group)
+        kwargs = _with_deadline(kwargs)
+    except BaseException:
+        # запрос не отправлен, пробное разрешение полуоткрытого выключателя возвращается
+        if breaker is not None:
+            breaker.release(group, permit)
+        raise
+
+    metrics = settings.metrics
+    if metrics is None and breaker is None:
+        return (await _send_async_request(url, method, session, tracer, **kwargs))[1]
+
+    started = metrics.request_started(group) if metrics is not None else time.perf_counter()
     try:
-        async with aiohttp.client.ClientSession() as session:
-            async with session.request(method, url, **kwargs) as response:
-                logger.debug(f'Status {response.status} from {method} request to {url} with {kwargs}')
-                response.raise_for_status()
-                if response.status in (200, 302) and response.headers.get('Location'):
-                    raise FoundLocation(location=response.headers.get('Location'))
-                elif not response.content_type.startswith('application/json'):
-                    text = await response.text()
-                    logger.error(f'{response.content_type} -> {text}')
-                    raise esia_client.exceptions.IncorrectJsonError(
-                        f'Invalid content type -> {response.content_type}'
-                    )
-                return await response.json()
-    except aiohttp.client.ClientError as e:
+        status, response_json = await _send_async_request(url, method, session, tracer, **kwargs)
+    except FoundLocation as e:
+        _request_finished(settings, group, started, permit, status=e.status)
+        raise
+    except BaseException as e:
+        _request_finished(settings, group, started, permit, error=e)
+        raise
+    _request_finished(settings, group, started, permit, status=status)
+    return response_json
+
+
+async def _send_async_request(url: str, method: str, session: 'aiohttp.ClientSession',
+                              tracer: 'esia_client.tracing.Tracer' = None,
+                              codec: 'esia_client.codec.JsonCodec' = None, **kwargs) -> Tuple[int, dict]:
+    import aiohttp
+
+    codec = codec or esia_client.codec.default_codec()
+    try:
+        async with session.request(method, url, **kwargs) as response:
+            esia_client.log.log_event(logger, logging.DEBUG, 'http.response', 'Status %s from %s request to %s',
+                                      response.status, method, url, status=response.status, method=method, url=url)
+            response.raise_for_status()
+            if response.status in (200, 302) and response.headers.get('Location'):
+                raise FoundLocation(location=response.headers.get('Location'), status=response.status)
+            elif not response.content_type.startswith('application/json'):
+                logger.error('Unexpected content type %s from %s: %.200r', response.content_type, url,
+                             await response.read())
+                raise esia_client.exceptions.IncorrectJsonError(
+                    f'Invalid content type -> {response.content_type}'
+                )
+            with esia_client.tracing.span(tracer, 'http.read_body'):
+                body = await response.read()
+            with esia_client.tracing.span(tracer, 'json.decode'):
+                return response.status, codec.loads(body)
+    except aiohttp.ClientError as e:
         logger.error(e, exc_info=True)
         raise esia_client.exceptions.HttpError(e)
     except ValueError as e:
@@ -95,19 +321,15 @@ def sign(content: str, crt: crypto.X509, pkey: crypto.PKey) -> str:
     """
     Подписывает параметры запроса цифровой подписью
 
+    Для повторяющихся подписей следует использовать `Settings.signer`
+
     Args:
         data: Данные, которые необходимо подписать
         crt: Путь до сертификата
         pkey: Путь до приватного ключа
 
     """
-    bio_in = crypto._new_mem_buf(content.encode())
-    PKCS7_DETACHED = 0x40
-    pkcs7 = crypto._lib.PKCS7_sign(crt._x509, pkey._pkey, crypto._ffi.NULL, bio_in, PKCS7_DETACHED)
-    bio_out = crypto._new_mem_buf()
-    crypto._lib.i2d_PKCS7_bio(bio_out, pkcs7)
-    sigbytes = crypto._bio_to_string(bio_out)
-    return base64.urlsafe_b64encode(sigbytes).decode()
+    return esia_client.signing.Signer(crt, pkey).sign(content)
 
 
 def get_timestamp() -> str:
@@ -117,23 +339,52 @@ def get_timestamp() -> str:
     return datetime.datetime.now(pytz.utc).strftime('%Y.%m.%d %H:%M:%S %z').strip()
 
 
-def decode_payload(base64string: str) -> dict:
+def decode_payload(base64string: str, codec: 'esia_client.codec.JsonCodec' = None) -> dict:
     """
     Расшифровка информации из JWT токена
 
     Args:
         base64string: JSON в UrlencodedBaset64
+        codec: кодек JSON, по умолчанию `esia_client.codec.default_codec()`
 
     """
     offset = len(base64string) % 4
     base64string += '=' * (4 - offset) if offset else ''
     try:
-        return json.loads(base64.urlsafe_b64decode(base64string))
+        return (codec or esia_client.codec.default_codec()).loads(base64.urlsafe_b64decode(base64string))
     except (ValueError, Exception) as e:
         logger.error(e, exc_info=True)
         raise esia_client.exceptions.IncorrectMarkerError(e)
 
 
+def get_token_expiration(access_token: str, expires_in: float = None,
+                         codec: 'esia_client.codec.JsonCodec' = None) -> Optional[float]:
+    """
+    Время истечения токена (unix time) по полю `expires_in` ответа и полю `exp` JWT токена
+
+    Если известны оба значения, возвращается более раннее.
+
+    Args:
+        access_token: токен авторизации
+        expires_in: время жизни токена в секундах из ответа ЕСИА
+        codec: кодек JSON для декодирования JWT токена
+
+    """
+    candidates = []
+    if expires_in is not None:
+        try:
+            candidates.append(time.time() + float(expires_in))
+        except (TypeError, ValueError):
+            logger.warning('Invalid expires_in value: %r', expires_in)
+    parts = access_token.split('.')
+    if len(parts) == 3:
+        try:
+            candidates.append(float(decode_payload(parts[1], codec)['exp']))
+        except (esia_client.exceptions.IncorrectMarkerError, KeyError, TypeError, ValueError):
+            pass
+    return min(candidates) if candidates else None
+
+
 def format_uri_params(params: dict) -> str:
     """
     Форматирует строку с URI параметрами
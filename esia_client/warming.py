@@ -0,0 +1,202 @@
+import asyncio
+import concurrent.futures
+import contextlib
+import logging
+import socket
+import time
+from typing import *
+
+import furl
+
+import esia_client.exceptions
+import esia_client.log
+from esia_client.client import EBS, Auth, Settings
+from esia_client.signing import SigningPool
+from esia_client.transport import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+__all__ = ['WarmupReport', 'warmup', 'warmup_async']
+
+
+class WarmupReport:
+    """
+    Длительность шагов прогрева клиента и ошибки шагов
+
+    Ошибка шага не прерывает остальные шаги, поэтому отчет показывает все неготовые компоненты сразу.
+    Для проверки готовности (readiness probe) достаточно `report.ok`.
+    """
+
+    def __init__(self):
+        self.steps = {}
+        self.errors = {}
+        self.started = time.perf_counter()
+        self.total = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    @contextlib.contextmanager
+    def step(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.errors[name] = e
+            logger.warning('Warmup step %s failed: %s: %s', name, type(e).__name__, e)
+        finally:
+            self.steps[name] = time.perf_counter() - started
+
+    def finish(self) -> 'WarmupReport':
+        self.total = time.perf_counter() - self.started
+        esia_client.log.log_event(logger, logging.INFO if self.ok else logging.WARNING, 'warmup',
+                                  'Warmup finished in %.3fs, failed steps: %s', self.total,
+                                  ', '.join(self.errors) or 'none',
+                                  steps=self.steps, failed=list(self.errors), total=self.total)
+        return self
+
+    def as_dict(self) -> dict:
+        return {
+            'ok': self.ok,
+            'total': self.total,
+            'steps': dict(self.steps),
+            'errors': {name: f'{type(error).__name__}: {error}' for name, error in self.errors.items()},
+        }
+
+    def __repr__(self):
+        steps = ' '.join(f'{name}={duration * 1000:.1f}ms' for name, duration in self.steps.items())
+        return f'<{self.__class__.__name__} ok={self.ok} {steps}>'
+
+
+def _targets(settings: Settings, ebs_url: Optional[str], check_ebs: bool) -> Dict[str, furl.furl]:
+    targets = {'esia': settings.esia_service_url}
+    if check_ebs:
+        targets['ebs'] = furl.furl(ebs_url or EBS._SERIVCE_URL)
+    return targets
+
+
+def _address(url: furl.furl) -> Tuple[str, int]:
+    return url.host, url.port or (443 if url.scheme == 'https' else 80)
+
+
+def _origin(url: furl.furl) -> str:
+    return f'{url.scheme}://{url.netloc}/'
+
+
+def _preload(settings: Settings):
+    """
+    Создает то, что иначе создается при первом запросе: класс `esia_client.exceptions.HttpError`
+    (при этом импортируется HTTP-библиотека) и скомпилированные URL конечных точек `Settings.endpoints`
+    """
+    _ = esia_client.exceptions.HttpError
+    _ = settings.endpoints
+
+
+def _dry_run_signature(settings: Settings) -> str:
+    """
+    Подписывает параметры ссылки авторизации, не учитывая подпись в метриках
+    """
+    auth = Auth(settings)
+    params = auth._auth_url_params()
+    params['client_secret'] = settings.signer.sign(auth._signature_content(params))
+    return auth._build_auth_url(params)
+
+
+def warmup(settings: Settings, ebs_url: str = None, check_ebs: bool = True, connections: int = 1) -> WarmupReport:
+    """
+    Прогрев синхронного клиента перед обработкой запросов
+
+    Загружает HTTP-библиотеку и отложенно импортируемые модули, формирует пробную подпись,
+    разрешает имена стендов ЕСИА и ЕБС и открывает keep-alive соединения в пуле `Settings.http_session`
+    запросом HEAD к корню стенда (статус ответа не проверяется).
+
+    Пример:
+        report = esia_client.warming.warmup(settings, connections=4)
+        if not report.ok:
+            ...
+
+    Args:
+        settings: настройки клиента ЕСИА
+        ebs_url: ссылка на стенд ЕБС, по умолчанию стенд `EBS`
+        check_ebs: прогревать соединения с ЕБС
+        connections: количество соединений, открываемых к каждому стенду
+
+    Returns:
+        Отчет с длительностью шагов
+    """
+    report = WarmupReport()
+    with report.step('imports'):
+        session = settings.http_session
+        _preload(settings)
+    with report.step('sign'):
+        _dry_run_signature(settings)
+
+    targets = _targets(settings, ebs_url, check_ebs)
+    for name, url in targets.items():
+        with report.step(f'dns:{name}'):
+            socket.getaddrinfo(*_address(url), type=socket.SOCK_STREAM)
+
+    def connect(url: str):
+        session.head(url, timeout=settings.timeout, allow_redirects=False).close()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, connections)) as executor:
+        for name, url in targets.items():
+            if 'imports' in report.errors or f'dns:{name}' in report.errors:
+                continue
+            with report.step(f'connect:{name}'):
+                for future in [executor.submit(connect, _origin(url)) for _ in range(connections)]:
+                    future.result()
+    return report.finish()
+
+
+async def warmup_async(settings: Settings, session: AsyncSession, ebs_url: str = None, check_ebs: bool = True,
+                       connections: int = 1, signing_pool: SigningPool = None) -> WarmupReport:
+    """
+    Прогрев асинхронного клиента перед обработкой запросов
+
+    Открывает сессию, формирует пробную подпись (и в пуле `signing_pool`, если он используется),
+    разрешает имена стендов ЕСИА и ЕБС и открывает keep-alive соединения в пуле сессии запросом HEAD
+    к корню стенда (статус ответа не проверяется), что также заполняет кэш DNS сессии.
+
+    Args:
+        settings: настройки клиента ЕСИА
+        session: общая асинхронная HTTP-сессия клиентов
+        ebs_url: ссылка на стенд ЕБС, по умолчанию стенд `EBS`
+        check_ebs: прогревать соединения с ЕБС
+        connections: количество соединений, открываемых к каждому стенду
+        signing_pool: пул формирования подписи `AsyncAuth`
+
+    Returns:
+        Отчет с длительностью шагов
+    """
+    import aiohttp
+
+    report = WarmupReport()
+    with report.step('imports'):
+        client_session = await session.open()
+        _preload(settings)
+    with report.step('sign'):
+        _dry_run_signature(settings)
+    if signing_pool is not None:
+        with report.step('signing_pool'):
+            await asyncio.gather(*(signing_pool.sign('warmup') for _ in range(signing_pool.max_workers)))
+
+    loop = asyncio.get_event_loop()
+    targets = _targets(settings, ebs_url, check_ebs)
+    for name, url in targets.items():
+        with report.step(f'dns:{name}'):
+            await loop.getaddrinfo(*_address(url), type=socket.SOCK_STREAM)
+
+    timeout = aiohttp.ClientTimeout(total=settings.timeout)
+
+    async def connect(url: str):
+        async with client_session.head(url, timeout=timeout, allow_redirects=False):
+            pass
+
+    for name, url in targets.items():
+        if 'imports' in report.errors or f'dns:{name}' in report.errors:
+            continue
+        with report.step(f'connect:{name}'):
+            await asyncio.gather(*(connect(_origin(url)) for _ in range(connections)))
+    return report.finish()
@@ -16,5 +16,6 @@ setup(
     extras_require={
         'sync': ['requests==2.19.1'],
         'async': ['aiohttp==3.4.4'],
+        'orjson': ['orjson>=3.0'],
     }
 )
@@ -0,0 +1,51 @@
+import asyncio
+import threading
+import unittest
+
+from esia_client.cache import CacheBackend, MemoryCacheBackend, ResponseCache
+
+
+class MemoryCacheBackendTest(unittest.TestCase):
+    def test_oversized_value_drops_previous_value(self):
+        backend = MemoryCacheBackend(max_bytes=10)
+        backend.set('key', b'old', 60)
+        backend.set('key', b'x' * 20, 60)
+
+        self.assertIsNone(backend.get('key'))
+        self.assertEqual((len(backend), backend.size), (0, 0))
+
+
+class _ThreadRecordingBackend(MemoryCacheBackend):
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def get(self, key):
+        self.threads.add(threading.get_ident())
+        return super().get(key)
+
+    def set(self, key, value, ttl):
+        self.threads.add(threading.get_ident())
+        super().set(key, value, ttl)
+
+    get_async = CacheBackend.get_async
+    set_async = CacheBackend.set_async
+    delete_prefix_async = CacheBackend.delete_prefix_async
+
+
+class ResponseCacheAsyncTest(unittest.TestCase):
+    def test_blocking_backend_is_called_outside_event_loop(self):
+        backend = _ThreadRecordingBackend()
+        cache = ResponseCache(backend=backend)
+        url = 'https://esia.gosuslugi.ru/rs/prns/1'
+
+        async def run():
+            await cache.set_async('1', 'token', url, {'oid': 1})
+            return await cache.get_async('1', 'token', url), await cache.invalidate_async('1')
+
+        self.assertEqual(asyncio.run(run()), ({'oid': 1}, 1))
+        self.assertNotIn(threading.get_ident(), backend.threads)
+
+
+if __name__ == '__main__':
+    unittest.main()
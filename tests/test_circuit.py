@@ -0,0 +1,28 @@
+import time
+import unittest
+
+from esia_client.circuit import Circuit, CircuitState
+from esia_client.endpoints import EndpointGroup
+
+
+class CircuitTest(unittest.TestCase):
+    def setUp(self):
+        self.circuit = Circuit(EndpointGroup.Rest, window=4, min_calls=2, open_duration=0.05, half_open_calls=1)
+
+    def test_call_started_before_opening_does_not_close_half_open_circuit(self):
+        straggler = self.circuit.before_call()
+        for _ in range(2):
+            self.circuit.record(0.01, True, self.circuit.before_call())
+        self.assertIs(self.circuit.state, CircuitState.Open)
+        time.sleep(0.06)
+
+        trial = self.circuit.before_call()
+        self.circuit.record(0.01, False, straggler)
+        self.assertIs(self.circuit.state, CircuitState.HalfOpen)
+
+        self.circuit.record(0.01, False, trial)
+        self.assertIs(self.circuit.state, CircuitState.Closed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import asyncio
+import unittest
+
+from esia_client.polling import VerificationPoller
+
+
+class _FakeEBS:
+    session = object()
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.oid = session_id
+
+    async def _request_result(self):
+        return {'session_id': self.session_id}
+
+    def _decode_result(self, response: dict) -> dict:
+        return response
+
+
+class VerificationPollerTest(unittest.TestCase):
+    def test_slow_result_handler_does_not_block_polling(self):
+        async def run():
+            handled = []
+            release = asyncio.Event()
+
+            async def on_result(result):
+                handled.append(result.session_id)
+                await release.wait()
+
+            async with VerificationPoller(concurrency=1, initial_delay=0.01, jitter=0, on_result=on_result) as poller:
+                futures = [poller.add(_FakeEBS(f's{i}')) for i in range(3)]
+                done, _ = await asyncio.wait(futures, timeout=1)
+                release.set()
+                return len(done), sorted(handled)
+
+        self.assertEqual(asyncio.run(run()), (3, ['s0', 's1', 's2']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import asyncio
+import http.server
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from OpenSSL import crypto
+
+from esia_client import Scope, Settings, UserInfo
+from esia_client.async_client import AsyncSession, AsyncUserInfo
+
+
+def _write_key_pair(directory: str):
+    key = crypto.PKey()
+    key.generate_key(crypto.TYPE_RSA, 2048)
+    crt = crypto.X509()
+    crt.get_subject().CN = 'test'
+    crt.set_serial_number(1)
+    crt.gmtime_adj_notBefore(0)
+    crt.gmtime_adj_notAfter(3600)
+    crt.set_issuer(crt.get_subject())
+    crt.set_pubkey(key)
+    crt.sign(key, 'sha256')
+    cert_file, key_file = os.path.join(directory, 'crt.pem'), os.path.join(directory, 'key.pem')
+    with open(cert_file, 'wb') as f:
+        f.write(crypto.dump_certificate(crypto.FILETYPE_PEM, crt))
+    with open(key_file, 'wb') as f:
+        f.write(crypto.dump_privatekey(crypto.FILETYPE_PEM, key))
+    return cert_file, key_file
+
+
+class _CookieHandler(http.server.BaseHTTPRequestHandler):
+    cookies = []
+
+    def do_GET(self):
+        self.cookies.append((self.headers.get('Authorization'), self.headers.get('Cookie')))
+        body = json.dumps({'oid': 1}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Set-Cookie', 'sess=%s; Path=/' % self.headers.get('Authorization').split()[-1])
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SharedSessionCookiesTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.cert_file, cls.key_file = _write_key_pair(cls.tmp.name)
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _CookieHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.tmp.cleanup()
+
+    def setUp(self):
+        _CookieHandler.cookies = []
+        # aiohttp не сохраняет cookies хостов, заданных IP-адресом
+        url = 'http://localhost:%d' % self.server.server_address[1]
+        self.settings = Settings('client', 'http://localhost/', self.cert_file, self.key_file, url,
+                                 [Scope.Fullname])
+        self.addCleanup(self.settings.close)
+
+    def test_sync_session_does_not_share_cookies_between_users(self):
+        UserInfo('AAAAA', '1', self.settings).get_person_main_info()
+        UserInfo('BBBBB', '2', self.settings).get_person_main_info()
+
+        self.assertEqual(_CookieHandler.cookies, [('Bearer AAAAA', None), ('Bearer BBBBB', None)])
+        self.assertEqual(len(self.settings.http_session.cookies), 0)
+
+    def test_async_session_does_not_share_cookies_between_users(self):
+        async def run():
+            async with AsyncSession(self.settings) as session:
+                await AsyncUserInfo('AAAAA', '1', self.settings, session=session).get_person_main_info()
+                await AsyncUserInfo('BBBBB', '2', self.settings, session=session).get_person_main_info()
+                return len(session.client_session.cookie_jar)
+
+        self.assertEqual(asyncio.run(run()), 0)
+        self.assertEqual(_CookieHandler.cookies, [('Bearer AAAAA', None), ('Bearer BBBBB', None)])
+
+
+if __name__ == '__main__':
+    unittest.main()